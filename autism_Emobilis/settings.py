@@ -67,20 +67,51 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'my_app.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
 }
+
+# Per-process cache of the user columns CachedJWTAuthentication needs (entries, seconds)
+JWT_USER_CACHE_SIZE = 10000
+JWT_USER_CACHE_TTL = 60
+
+# Token revocation (logout): how often each process pulls new revocations, how often
+# it rebuilds its Bloom filter without expired JTIs, and the filter's initial capacity
+REVOCATION_REFRESH_SECONDS = 5
+REVOCATION_REBUILD_SECONDS = 3600
+REVOCATION_FILTER_CAPACITY = 10000
+
+# Keyset pagination for the *_list endpoints (see my_app/pagination.py)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+# Rows fetched per server-side cursor round trip when a list is streamed (?stream=1)
+API_STREAM_CHUNK_SIZE = 500
+# Largest array accepted by the bulk create/update/delete endpoints
+API_MAX_BULK_SIZE = 1000
+# Delta sync: rows per resource per call, and how old a change must be before it is served
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 2
+
+# EmailOrUsernameModelBackend extends ModelBackend (permissions included), so listing
+# ModelBackend as well would only repeat the lookup after every failed login
 AUTHENTICATION_BACKENDS = [
     'my_app.authentication.EmailOrUsernameModelBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
+# Seconds an identifier that matched no user is remembered by the login backend
+AUTH_NEGATIVE_CACHE_TTL = 30
+# Async login (api/token/login/async): hash pool threads (default: CPU count) and how
+# many password checks may queue before new logins get 429 Too Many Requests
+LOGIN_HASH_WORKERS = env.int('LOGIN_HASH_WORKERS', default=None)
+LOGIN_HASH_MAX_PENDING = env.int('LOGIN_HASH_MAX_PENDING', default=None)
 
 
 
 MIDDLEWARE = [
+    # Outermost, so request latency covers the rest of the stack (see my_app.metrics)
+    'my_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 'django.middleware.common.CommonMiddleware',
@@ -133,6 +164,23 @@ DATABASES = {
 }
 
 
+# Cache
+# LocMem unless CACHE_URL points at a shared backend, e.g. redis://localhost:6379/1
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds a serialized payload stays cached; versions are bumped on every write
+SERIALIZED_CACHE_TIMEOUT = 300
+
+# Seconds a user's visible profile ids stay cached for row-level scoping; only used
+# with a shared CACHE_URL, a per-process cache (locmem) is bypassed for this lookup
+SCOPE_CACHE_TIMEOUT = 300
+
+# Upper bounds (seconds) of the per-endpoint latency histogram buckets served at /metrics
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
 AUTH_USER_MODEL= 'my_app.CustomUser'
 
 # Password validation
@@ -1,25 +1,27 @@
 from django.contrib import admin
 from django.urls import path
 
-from my_app import views
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenBlacklistView,
-)
-
-from my_app.views import CustomTokenObtainPairView
+from my_app import views, async_views
+from my_app.views import CustomTokenObtainPairView, RevocableTokenRefreshView
 
 urlpatterns = [
     # Login
     path('api/token/login', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('api/token/logout/', TokenBlacklistView.as_view(), name='token_blacklist'),
+    path('api/token/login/async', views.async_login, name='token_obtain_pair_async'),
+    path('api/token/refresh/', RevocableTokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/logout/', views.logout, name='token_blacklist'),
 
     # Profiles
     path('api/v1/create_profile', views.create_profile),
     path('api/v1/profile', views.profile_list),
     path('api/v1/profile/<int:profile_id>', views.single_profile),
+    path('api/v1/profile/<int:profile_id>/episodes', views.profile_episodes),
+    path('api/v1/profile/<int:profile_id>/triggers', views.profile_triggers),
+    path('api/v1/profile/<int:profile_id>/behaviors', views.profile_behaviors),
+    path('api/v1/profile/<int:profile_id>/interventions', views.profile_interventions),
+    path('api/v1/profile/<int:profile_id>/sessions', views.profile_sessions),
+    path('api/v1/profile/<int:profile_id>/timeline', views.profile_timeline),
+    path('api/v1/profile/<int:profile_id>/analytics', views.profile_analytics),
     path('api/v1/profile/update/<int:profile_id>', views.update_profile),
     path('api/v1/profile/delete/<int:profile_id>', views.delete_profile),
 
@@ -29,6 +31,9 @@ urlpatterns = [
     path('api/v1/trigger/<int:trigger_id>', views.single_trigger),
     path('api/v1/trigger/update/<int:trigger_id>', views.update_trigger),
     path('api/v1/trigger/delete/<int:trigger_id>', views.delete_trigger),
+    path('api/v1/trigger/bulk/create', views.bulk_create_triggers),
+    path('api/v1/trigger/bulk/update', views.bulk_update_triggers),
+    path('api/v1/trigger/bulk/delete', views.bulk_delete_triggers),
 
     # Behaviors
     path('api/v1/behavior/create', views.create_behavior),
@@ -36,6 +41,9 @@ urlpatterns = [
     path('api/v1/behavior/<int:behavior_id>', views.single_behavior),
     path('api/v1/behavior/update/<int:behavior_id>', views.update_behavior),
     path('api/v1/behavior/delete/<int:behavior_id>', views.delete_behavior),
+    path('api/v1/behavior/bulk/create', views.bulk_create_behaviors),
+    path('api/v1/behavior/bulk/update', views.bulk_update_behaviors),
+    path('api/v1/behavior/bulk/delete', views.bulk_delete_behaviors),
 
     # Interventions
     path('api/v1/intervention/create', views.create_intervention),
@@ -43,9 +51,13 @@ urlpatterns = [
     path('api/v1/intervention/<int:intervention_id>', views.single_intervention),
     path('api/v1/intervention/update/<int:intervention_id>', views.update_intervention),
     path('api/v1/intervention/delete/<int:intervention_id>', views.delete_intervention),
+    path('api/v1/intervention/bulk/create', views.bulk_create_interventions),
+    path('api/v1/intervention/bulk/update', views.bulk_update_interventions),
+    path('api/v1/intervention/bulk/delete', views.bulk_delete_interventions),
 
     # Episodes
     path('api/v1/episode/create', views.create_episode),
+    path('api/v1/episode/ingest', views.ingest_episode),
     path('api/v1/episode', views.episode_list),
     path('api/v1/episode/<int:episode_id>', views.single_episode),
     path('api/v1/episode/update/<int:episode_id>', views.update_episode),
@@ -54,6 +66,7 @@ urlpatterns = [
     # Users
     path('api/v1/user/create', views.create_user),
     path('api/v1/user', views.user_list),
+    path('api/v1/user/me', views.current_user),
     path('api/v1/user/<int:user_id>', views.single_user),
     path('api/v1/user/update/<int:user_id>', views.update_user),
     path('api/v1/user/delete/<int:user_id>', views.delete_user),
@@ -64,6 +77,9 @@ urlpatterns = [
     path('api/v1/session', views.session_list),
     path('api/v1/session/<int:session_id>', views.single_session),
     path('api/v1/session/update/<int:session_id>', views.update_session),
+    path('api/v1/session/bulk/create', views.bulk_create_sessions),
+    path('api/v1/session/bulk/update', views.bulk_update_sessions),
+    path('api/v1/session/bulk/delete', views.bulk_delete_sessions),
 
 
     #school
@@ -76,10 +92,42 @@ urlpatterns = [
    #therapists
     path('api/v1/therapist/', views.therapist_list, name='therapist_list'),
     path('api/v1/therapist/create', views.create_therapist, name='create_therapist'),
-    path('api/v1/therapist/<int:theraist_id>', views.single_therapist, name='single_therapist'),
+    path('api/v1/therapist/<int:therapist_id>', views.single_therapist, name='single_therapist'),
     path('api/v1/therapist/update/<int:therapist_id>', views.update_therapist, name='update_therapist'),
     path('api/v1/therapist/delete/<int:therapist_id>', views.delete_therapist, name='delete_therapist'),
 
+    # Delta sync
+    path('api/v1/sync', views.sync),
+
+    # Bulk export (gzip NDJSON)
+    path('api/v1/export', views.export_records),
+
+    # Serialized cache hit/miss counts
+    path('api/v1/cache/stats', views.cache_stats),
+
+    # Per-endpoint latency / query / serializer / size metrics (Prometheus text format)
+    path('metrics', views.metrics, name='metrics'),
+
+    # Async read endpoints (same payloads as the sync lists/details above)
+    path('api/v1/async/profile', async_views.profile_list),
+    path('api/v1/async/profile/<int:profile_id>', async_views.single_profile),
+    path('api/v1/async/trigger', async_views.trigger_list),
+    path('api/v1/async/trigger/<int:trigger_id>', async_views.single_trigger),
+    path('api/v1/async/behavior', async_views.behavior_list),
+    path('api/v1/async/behavior/<int:behavior_id>', async_views.single_behavior),
+    path('api/v1/async/intervention', async_views.intervention_list),
+    path('api/v1/async/intervention/<int:intervention_id>', async_views.single_intervention),
+    path('api/v1/async/episode', async_views.episode_list),
+    path('api/v1/async/episode/<int:episode_id>', async_views.single_episode),
+    path('api/v1/async/user', async_views.user_list),
+    path('api/v1/async/user/<int:user_id>', async_views.single_user),
+    path('api/v1/async/session', async_views.session_list),
+    path('api/v1/async/session/<int:session_id>', async_views.single_session),
+    path('api/v1/async/school', async_views.school_list),
+    path('api/v1/async/school/<int:school_id>', async_views.single_school),
+    path('api/v1/async/therapist', async_views.therapist_list),
+    path('api/v1/async/therapist/<int:therapist_id>', async_views.single_therapist),
+
 
 path('admin/', admin.site.urls),
 ]
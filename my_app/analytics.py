@@ -0,0 +1,120 @@
+import calendar
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Episode, EpisodeRollup
+
+
+# Episode rollups: per profile and day / week / month, the episode count, total
+# duration and severity counts. Reads come straight from EpisodeRollup (one indexed
+# range scan); writes keep it current incrementally: an episode's share (1, its
+# duration, 1 for its severity) is taken out of the buckets it leaves and added to
+# the ones it enters with F() updates, so a write never re-aggregates episodes.
+# rebuild_rollups recomputes everything from scratch (bulk loads, repairs).
+
+ROLLUP_AGGREGATES = {
+    'episode_count': Count('id'),
+    'total_duration': Sum('duration'),
+    'low_count': Count('id', filter=Q(severity='Low')),
+    'medium_count': Count('id', filter=Q(severity='Medium')),
+    'high_count': Count('id', filter=Q(severity='High')),
+}
+
+SEVERITY_COUNTS = {'Low': 'low_count', 'Medium': 'medium_count', 'High': 'high_count'}
+
+PERIOD_TRUNCATES = {
+    EpisodeRollup.DAY: TruncDay,
+    EpisodeRollup.WEEK: TruncWeek,
+    EpisodeRollup.MONTH: TruncMonth,
+}
+
+
+def period_bounds(period, day):
+    """[start, end) of the ``period`` bucket containing ``day``."""
+    if period == EpisodeRollup.DAY:
+        return day, day + timedelta(days=1)
+    if period == EpisodeRollup.WEEK:
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    start = day.replace(day=1)
+    return start, start + timedelta(days=calendar.monthrange(day.year, day.month)[1])
+
+
+def _shift(share, sign):
+    # Add (sign 1) or take out (sign -1) one episode's share of its three buckets
+    profile_id, day, duration, severity = share
+    starts = {period: period_bounds(period, day)[0] for period in PERIOD_TRUNCATES}
+    rows = EpisodeRollup.objects.filter(profile_id=profile_id).filter(
+        reduce(or_, (Q(period=period, period_start=start) for period, start in starts.items()))
+    )
+    changes = {
+        'episode_count': F('episode_count') + sign,
+        'total_duration': F('total_duration') + duration * sign,
+        'updated_at': timezone.now(),  # update() skips auto_now
+    }
+    if severity in SEVERITY_COUNTS:
+        changes[SEVERITY_COUNTS[severity]] = F(SEVERITY_COUNTS[severity]) + sign
+
+    updated = rows.update(**changes)
+    if sign < 0:
+        rows.filter(episode_count=0).delete()
+    elif updated < len(starts):
+        existing = set(rows.values_list('period', flat=True))
+        severity_count = {SEVERITY_COUNTS[severity]: 1} if severity in SEVERITY_COUNTS else {}
+        missing = [
+            EpisodeRollup(profile_id=profile_id, period=period, period_start=start, episode_count=1,
+                          total_duration=duration, **severity_count)
+            for period, start in starts.items() if period not in existing
+        ]
+        try:
+            with transaction.atomic():
+                EpisodeRollup.objects.bulk_create(missing)
+        except IntegrityError:
+            # Another writer created them since the update: add to theirs instead
+            rows.filter(period__in=[rollup.period for rollup in missing]).update(**changes)
+
+
+def episode_share(profile_id, day, duration, severity, is_deleted=False):
+    """What one episode contributes to the rollups, or None when it is not counted."""
+    if is_deleted:
+        return None
+    # Instances created with a string date keep it until they are reloaded
+    return profile_id, Episode._meta.get_field('episode_date').to_python(day), duration, severity
+
+
+def move_episode_share(previous, current):
+    """Take an episode's ``previous`` share out of the rollups and add its ``current`` one."""
+    if previous == current:
+        return
+    with transaction.atomic(savepoint=False):
+        if previous is not None:
+            _shift(previous, -1)
+        if current is not None:
+            _shift(current, 1)
+
+
+def rebuild_rollups(batch_size=1000):
+    """Drop every rollup and recompute them with one grouped aggregate per period."""
+    created = 0
+    with transaction.atomic():
+        EpisodeRollup.objects.all().delete()
+        for period, truncate in PERIOD_TRUNCATES.items():
+            rows = (
+                Episode.objects.values('profile_id', period_start=truncate('episode_date'))
+                .annotate(**ROLLUP_AGGREGATES)
+                .order_by()
+            )
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(EpisodeRollup(period=period, **row))
+                if len(batch) >= batch_size:
+                    created += len(EpisodeRollup.objects.bulk_create(batch))
+                    batch = []
+            created += len(EpisodeRollup.objects.bulk_create(batch))
+    return created
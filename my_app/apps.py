@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MyAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'my_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the cache invalidation receivers)
+        from . import metrics
+        metrics.install()
@@ -0,0 +1,176 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+from my_app.models import Profile, Trigger, Behavior, Intervention, Session, Episode, Therapist, School
+from my_app.my_serializers import (
+    ProfileSerializer, TriggerSerializer, BehaviorSerializer, InterventionSerializer,
+    SessionSerializer, UserSerializer, EpisodeSerializer, SchoolSerializer, TherapistSerializer,
+)
+from my_app.authentication import CachedJWTAuthentication
+from my_app.query_planner import optimize_queryset
+from my_app.pagination import KeysetPagination
+from my_app.filters import filter_queryset, requested_ordering
+from my_app.scoping import scope_queryset
+from my_app.metrics import timed_serialization
+
+User = get_user_model()
+
+
+# Async read endpoints (served under /api/v1/async/...). They are plain Django async
+# views rather than @api_view functions -- DRF views are sync only -- so under ASGI
+# they run on the event loop instead of occupying asgiref's sync thread for the
+# whole request. Rows are fetched with the async queryset API (async for / aget);
+# payloads and owner scoping match the sync endpoints, without the ETag and cache layers.
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    # DRF's encoder, so decimals, dates and UUIDs render as they do through Response
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, safe=False)
+
+
+def _error(exc):
+    # APIExceptions (bad token, filter or cursor) shaped like DRF's error responses
+    detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return _json(detail, exc.status_code)
+
+
+async def _scoped(request, queryset):
+    # Same JWT authentication as the DRF views; no Authorization header means anonymous
+    result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    user = result[0] if result else AnonymousUser()
+    return await sync_to_async(scope_queryset)(queryset, user)
+
+
+async def alist_response(request, queryset, serializer_class, ordering_field='created_at'):
+    try:
+        paginator = KeysetPagination(requested_ordering(request, queryset.model, ordering_field))
+        queryset = filter_queryset(await _scoped(request, queryset), request)
+        page = await paginator.apaginate_queryset(queryset, request)
+    except APIException as exc:
+        return _error(exc)
+    serializer = serializer_class(page, many=True)
+    with timed_serialization():
+        data = serializer.data
+    return _json(paginator.get_paginated_data(data))
+
+
+async def adetail_response(request, queryset, serializer_class, **lookup):
+    try:
+        instance = await (await _scoped(request, queryset)).aget(**lookup)
+    except APIException as exc:
+        return _error(exc)
+    except queryset.model.DoesNotExist:
+        message = f'No {queryset.model._meta.object_name} matches the given query.'
+        return _json({'detail': message}, status.HTTP_404_NOT_FOUND)
+    with timed_serialization():
+        data = serializer_class(instance).data
+    return _json(data)
+
+
+# USER VIEWS
+@require_GET
+async def user_list(request):
+    users = optimize_queryset(User.objects.filter(is_deleted=False), UserSerializer)
+    return await alist_response(request, users, UserSerializer, 'date_joined')
+
+
+@require_GET
+async def single_user(request, user_id):
+    users = optimize_queryset(User.objects.all(), UserSerializer)
+    return await adetail_response(request, users, UserSerializer, id=user_id, is_deleted=False)
+
+
+# PROFILE VIEWS
+@require_GET
+async def profile_list(request):
+    profiles = optimize_queryset(Profile.objects.all(), ProfileSerializer)
+    return await alist_response(request, profiles, ProfileSerializer)
+
+
+@require_GET
+async def single_profile(request, profile_id):
+    profiles = optimize_queryset(Profile.objects.all(), ProfileSerializer)
+    return await adetail_response(request, profiles, ProfileSerializer, id=profile_id)
+
+
+# TRIGGER VIEWS
+@require_GET
+async def trigger_list(request):
+    return await alist_response(request, Trigger.objects.all(), TriggerSerializer)
+
+
+@require_GET
+async def single_trigger(request, trigger_id):
+    return await adetail_response(request, Trigger.objects.all(), TriggerSerializer, id=trigger_id)
+
+
+# BEHAVIOR VIEWS
+@require_GET
+async def behavior_list(request):
+    return await alist_response(request, Behavior.objects.all(), BehaviorSerializer)
+
+
+@require_GET
+async def single_behavior(request, behavior_id):
+    return await adetail_response(request, Behavior.objects.all(), BehaviorSerializer, id=behavior_id)
+
+
+# INTERVENTION VIEWS
+@require_GET
+async def intervention_list(request):
+    return await alist_response(request, Intervention.objects.all(), InterventionSerializer)
+
+
+@require_GET
+async def single_intervention(request, intervention_id):
+    return await adetail_response(request, Intervention.objects.all(), InterventionSerializer, id=intervention_id)
+
+
+# SESSION VIEWS
+@require_GET
+async def session_list(request):
+    return await alist_response(request, Session.objects.all(), SessionSerializer)
+
+
+@require_GET
+async def single_session(request, session_id):
+    return await adetail_response(request, Session.objects.all(), SessionSerializer, id=session_id)
+
+
+# EPISODE VIEWS
+@require_GET
+async def episode_list(request):
+    return await alist_response(request, Episode.objects.all(), EpisodeSerializer)
+
+
+@require_GET
+async def single_episode(request, episode_id):
+    return await adetail_response(request, Episode.objects.all(), EpisodeSerializer, id=episode_id)
+
+
+# SCHOOL VIEWS
+@require_GET
+async def school_list(request):
+    return await alist_response(request, School.objects.all(), SchoolSerializer)
+
+
+@require_GET
+async def single_school(request, school_id):
+    return await adetail_response(request, School.objects.all(), SchoolSerializer, id=school_id)
+
+
+# THERAPIST VIEWS
+@require_GET
+async def therapist_list(request):
+    return await alist_response(request, Therapist.objects.all(), TherapistSerializer)
+
+
+@require_GET
+async def single_therapist(request, therapist_id):
+    return await adetail_response(request, Therapist.objects.all(), TherapistSerializer, id=therapist_id)
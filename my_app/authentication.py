@@ -1,27 +1,208 @@
 # authentication.py (or backends.py)
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .password_pool import get_pool
+from .revocation import revocation_store
 
 UserModel = get_user_model()
 
+
+def unknown_identifier_key(identifier):
+    # Keyed on exactly what _lookup matches (case-insensitively): stripping here would
+    # let a miss for "alice " lock out "alice"
+    digest = hashlib.sha256(identifier.lower().encode()).hexdigest()
+    return f'auth:unknown:{digest}'
+
+
+def forget_unknown_identifiers(*identifiers):
+    """Drop negative-cache entries, e.g. once a user with that email/username exists."""
+    cache.delete_many([unknown_identifier_key(identifier) for identifier in identifiers if identifier])
+
+
 class EmailOrUsernameModelBackend(ModelBackend):
     """
     Custom authentication backend to allow login with email or username.
+
+    Email and username are matched case-insensitively in a single query (served by
+    the UPPER() functional indexes on CustomUser), and identifiers that match nobody
+    are remembered for AUTH_NEGATIVE_CACHE_TTL seconds so repeated attempts skip the DB.
     """
+    def _lookup(self, username):
+        return UserModel._default_manager.filter(Q(email__iexact=username) | Q(username__iexact=username))[:5]
+
+    @staticmethod
+    def _pick(candidates, username):
+        # Same precedence as before: email first, then username; exact case wins ties
+        def rank(user):
+            if user.email == username:
+                return 0
+            if user.username == username:
+                return 1
+            return 2 if user.email.lower() == username.lower() else 3
+        return min(candidates, key=rank)
+
+    def _negative_ttl(self):
+        return getattr(settings, 'AUTH_NEGATIVE_CACHE_TTL', 30)
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None:
             username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
 
-        try:
-            # Try to authenticate by email first
-            user = UserModel.objects.get(email=username)
-        except UserModel.DoesNotExist:
-            try:
-                # Fallback to username if no match by email
-                user = UserModel.objects.get(username=username)
-            except UserModel.DoesNotExist:
-                return None
+        negative_key = unknown_identifier_key(username)
+        if cache.get(negative_key):
+            return None
 
+        candidates = list(self._lookup(username))
+        if not candidates:
+            cache.set(negative_key, True, self._negative_ttl())
+            return None
+
+        user = self._pick(candidates, username)
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """Async variant: async ORM lookup, password hashing on the bounded hash pool.
+
+        May raise PoolSaturated when the pool is full; callers should answer 429.
+        """
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        negative_key = unknown_identifier_key(username)
+        if await cache.aget(negative_key):
+            return None
+
+        candidates = [user async for user in self._lookup(username)]
+        if not candidates:
+            await cache.aset(negative_key, True, self._negative_ttl())
+            return None
+
+        user = self._pick(candidates, username)
+        if await get_pool().check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+# Stateless JWT user resolution. The token identifies the user; the few columns a
+# request needs (active/deleted state, user_type, flags) come from a per-process
+# LRU with a TTL, so most authenticated requests never touch the user table.
+USER_STATE_FIELDS = ['username', 'user_type', 'is_active', 'is_deleted', 'is_staff', 'is_superuser']
+
+
+class UserStateCache:
+    """Thread-safe bounded LRU of user_id -> state dict, entries expiring after ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return state
+
+    def put(self, user_id, state):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_state_cache = UserStateCache(
+    maxsize=getattr(settings, 'JWT_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+)
+
+
+class ClaimsUser(TokenUser):
+    """TokenUser carrying the cached state columns (user_type, is_deleted, ...)."""
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    @cached_property
+    def username(self):
+        return self.state['username']
+
+    @cached_property
+    def user_type(self):
+        return self.state['user_type']
+
+    @cached_property
+    def is_deleted(self):
+        return self.state['is_deleted']
+
+    @cached_property
+    def is_staff(self):
+        return self.state['is_staff']
+
+    @cached_property
+    def is_superuser(self):
+        return self.state['is_superuser']
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication returning a ClaimsUser instead of loading CustomUser per request."""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_store.is_revoked(validated_token.get(jwt_settings.JTI_CLAIM)):
+            raise InvalidToken('Token has been revoked')
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        state = user_state_cache.get(user_id)
+        if state is None:
+            state = (
+                UserModel._default_manager.filter(**{jwt_settings.USER_ID_FIELD: user_id})
+                .values(*USER_STATE_FIELDS)
+                .first()
+            )
+            if state is None:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            user_state_cache.put(user_id, state)
+
+        if not state['is_active'] or state['is_deleted']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return ClaimsUser(validated_token, state)
@@ -0,0 +1,179 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .caching import invalidate, invalidate_instances
+
+
+# Batch create / update / soft-delete for child records. Every item is validated on
+# its own so one bad row does not reject the batch; valid rows are written with a
+# single bulk query and the response lists per-item results and errors.
+
+
+class PreloadedRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField resolving ids from a map loaded up front in one query."""
+
+    def __init__(self, objects, **kwargs):
+        self.objects = objects
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+def _preload_related(child, items):
+    # Swap each writable FK field for one that looks ids up in a prefetched map,
+    # so validating N items costs one query per relation instead of N.
+    for name, field in list(child.fields.items()):
+        if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+        ids = set()
+        for item in items:
+            value = item.get(field.source) if isinstance(item, dict) else None
+            if (isinstance(value, int) and not isinstance(value, bool)) or (isinstance(value, str) and value.isdigit()):
+                ids.add(int(value))
+        child.fields[name] = PreloadedRelatedField(
+            field.get_queryset().in_bulk(ids),
+            queryset=field.get_queryset(),
+            required=field.required,
+            allow_null=field.allow_null,
+        )
+
+
+def _validate_items(serializer, items):
+    child = serializer.child
+    _preload_related(child, items)
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, child.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return valid, errors
+
+
+def _batch_response(results, errors, success_status):
+    if not results and errors:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif errors:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = success_status
+    return Response({'results': results, 'errors': errors}, status=response_status)
+
+
+def _is_id(value):
+    # JSON true/false arrive as bools, which are ints that would match ids 1 and 0
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_batch(data):
+    max_size = getattr(settings, 'API_MAX_BULK_SIZE', 1000)
+    if not isinstance(data, list):
+        return Response({'error': 'Expected a list of items'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(data) > max_size:
+        return Response({'error': f'At most {max_size} items per request'}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+def bulk_create(request, serializer_class):
+    invalid = _check_batch(request.data)
+    if invalid:
+        return invalid
+    serializer = serializer_class(data=request.data, many=True, context={'request': request})
+    valid, errors = _validate_items(serializer, request.data)
+
+    model = serializer.child.Meta.model
+    instances = [model(**data) for _, data in valid]
+    with transaction.atomic():
+        model.objects.bulk_create(instances)
+        invalidate_instances(instances)
+
+    results = [
+        {'index': index, 'data': serializer.child.to_representation(instance)}
+        for (index, _), instance in zip(valid, instances)
+    ]
+    return _batch_response(results, errors, status.HTTP_201_CREATED)
+
+
+def bulk_update(request, serializer_class, queryset=None):
+    invalid = _check_batch(request.data)
+    if invalid:
+        return invalid
+    # Partial updates: each item carries its id plus only the fields it changes
+    serializer = serializer_class(data=request.data, many=True, partial=True, context={'request': request})
+    model = serializer.child.Meta.model
+    if queryset is None:
+        queryset = model.objects.all()
+
+    ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+    instances = queryset.in_bulk([pk for pk in ids if _is_id(pk)])
+    items, errors = [], []
+    for index, item in enumerate(request.data):
+        pk = item.get('id') if isinstance(item, dict) else None
+        if not _is_id(pk) or pk not in instances:
+            errors.append({'index': index, 'errors': {'id': [f'{model.__name__} not found']}})
+        else:
+            items.append((index, item))
+
+    valid, validation_errors = _validate_items(serializer, [item for _, item in items])
+    errors.extend({**error, 'index': items[error['index']][0]} for error in validation_errors)
+
+    now = timezone.now()
+    fields = {'updated_at'}
+    updated = []
+    for position, data in valid:
+        index, item = items[position]
+        instance = instances[item['id']]
+        # A row moved to another profile must also invalidate the one it leaves
+        instance._previous_profile_id = getattr(instance, 'profile_id', None)
+        for attr, value in data.items():
+            setattr(instance, attr, value)
+        # bulk_update bypasses pre_save, so auto_now has to be applied by hand
+        instance.updated_at = now
+        fields.update(data)
+        updated.append((index, instance))
+
+    if updated:
+        with transaction.atomic():
+            model.objects.bulk_update([instance for _, instance in updated], sorted(fields))
+            invalidate_instances([instance for _, instance in updated])
+
+    results = [
+        {'index': index, 'data': serializer.child.to_representation(instance)}
+        for index, instance in updated
+    ]
+    errors.sort(key=lambda error: error['index'])
+    return _batch_response(results, errors, status.HTTP_200_OK)
+
+
+def bulk_delete(request, queryset):
+    """Soft-delete the listed ids; ids outside ``queryset`` are reported as not found."""
+    invalid = _check_batch(request.data)
+    if invalid:
+        return invalid
+    model = queryset.model
+    ids = [pk for pk in request.data if _is_id(pk)]
+    with transaction.atomic():
+        rows = dict(queryset.filter(pk__in=ids).values_list('pk', 'profile_id'))
+        found = set(rows)
+        # A single UPDATE ... SET is_deleted = true; it sends no post_save, hence the invalidate
+        model.objects.filter(pk__in=found).soft_delete()
+        invalidate(model, found, rows.values())
+
+    results, errors = [], []
+    for index, pk in enumerate(request.data):
+        if _is_id(pk) and pk in found:
+            results.append({'index': index, 'id': pk})
+        else:
+            errors.append({'index': index, 'errors': {'id': [f'{model.__name__} not found']}})
+    return _batch_response(results, errors, status.HTTP_200_OK)
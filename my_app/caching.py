@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Profile
+
+
+# Versioned read-through cache for serialized payloads.
+#
+# Every object has a version key and every model a list version key. Payloads are
+# stored under keys that embed the current version, so invalidating is a single
+# version bump: stale payloads are never read again and simply expire. A missing
+# version key (evicted or never written) is seeded with a fresh time-based value,
+# which can never match a payload cached under an earlier version.
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def stats():
+    """Hit/miss counts for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _timeout():
+    return getattr(settings, 'SERIALIZED_CACHE_TIMEOUT', 300)
+
+
+def _object_version_key(label, pk):
+    return f'serialized:version:{label}:{pk}'
+
+
+def _list_version_key(label):
+    return f'serialized:version:{label}:list'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Not cached yet: a fresh seed is newer than any version payloads were stored under
+        cache.set(key, time.time_ns(), None)
+
+
+def _read_through(key, build):
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data, True
+    _count('misses')
+    data = build()
+    cache.set(key, data, _timeout())
+    return data, False
+
+
+def cached_object(model, pk, build):
+    """Return (payload, hit) for one object; ``build`` serializes it on a miss."""
+    label = model._meta.label_lower
+    version = _version(_object_version_key(label, pk))
+    return _read_through(f'serialized:{label}:{pk}:{version}', build)
+
+
+def cached_list(model, request, build):
+    """Return (payload, hit) for a list response, keyed by model list version and query string."""
+    label = model._meta.label_lower
+    version = _version(_list_version_key(label))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return _read_through(f'serialized:{label}:list:{version}:{path}', build)
+
+
+def invalidate(model, pks=(), profile_ids=()):
+    """Bump the versions of ``pks`` and of the model's lists once the transaction commits.
+
+    Child rows also bump their parent profiles, whose serialized form nests them.
+    """
+    profile_ids = {pk for pk in profile_ids if pk is not None}
+    keys = [_list_version_key(model._meta.label_lower)]
+    keys += [_object_version_key(model._meta.label_lower, pk) for pk in pks]
+    profile_label = Profile._meta.label_lower
+    keys += [_object_version_key(profile_label, pk) for pk in profile_ids]
+    if profile_ids:
+        keys.append(_list_version_key(profile_label))
+
+    def bump():
+        for key in keys:
+            _bump(key)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_instances(instances):
+    """Invalidate ``instances`` and their profiles, including the one a moved row left.
+
+    The previous profile is read from ``_previous_profile_id``, set by the pre_save
+    receiver in signals.py (or by hand in bulk.bulk_update).
+    """
+    instances = list(instances)
+    if not instances:
+        return
+    profile_ids = [getattr(instance, 'profile_id', None) for instance in instances]
+    profile_ids += [getattr(instance, '_previous_profile_id', None) for instance in instances]
+    invalidate(type(instances[0]), [instance.pk for instance in instances], profile_ids)
@@ -0,0 +1,108 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .query_planner import nested_relations
+
+
+# Conditional GET: ETag / Last-Modified computed from updated_at with aggregate
+# queries, so an unchanged resource answers 304 before anything is serialized.
+# Nested children (e.g. a profile's triggers) are folded in through their own
+# updated_at; soft deletes bump updated_at, so they are seen as changes. Paginated
+# lists are validated over the requested keyset page only.
+
+
+def _child_annotations(serializer_class):
+    # Subquery annotations per nested relation: newest updated_at among its rows, and
+    # its live row count -- a child moved away or hard-deleted leaves no newer
+    # updated_at behind, but it does lower the count
+    latest, counts = {}, {}
+    for index, (related_model, lookup) in enumerate(nested_relations(serializer_class)):
+        rows = related_model.all_objects.filter(**{lookup: OuterRef('pk')}).order_by()
+        latest[f'_child_latest_{index}'] = Subquery(
+            rows.values(lookup).annotate(latest=Max('updated_at')).values('latest')
+        )
+        live = related_model.objects.filter(**{lookup: OuterRef('pk')}).order_by()
+        counts[f'_child_count_{index}'] = Subquery(live.values(lookup).annotate(count=Count('pk')).values('count'))
+    return latest, counts
+
+
+def _has_updated_at(model):
+    return any(field.name == 'updated_at' for field in model._meta.concrete_fields)
+
+
+def _validators(key, timestamps):
+    timestamps = [value for value in timestamps if value is not None]
+    if not timestamps:
+        return None
+    last_modified = max(timestamps)
+    digest = hashlib.md5(f'{key}|{last_modified.isoformat()}'.encode()).hexdigest()
+    return quote_etag(digest), int(last_modified.timestamp())
+
+
+def detail_validators(queryset, serializer_class):
+    """(etag, last_modified) for the single row in ``queryset``, or None if there is none."""
+    if not _has_updated_at(queryset.model):
+        return None
+    latest, counts = _child_annotations(serializer_class)
+    row = (
+        queryset.select_related(None).prefetch_related(None).order_by()
+        .annotate(**latest, **counts)
+        .values('pk', 'updated_at', *latest, *counts)
+        .first()
+    )
+    if row is None:
+        return None
+    members = ','.join(str(row[name] or 0) for name in counts)
+    key = f'{queryset.model._meta.label}:{row["pk"]}|{members}'
+    return _validators(key, [row['updated_at'], *(row[name] for name in latest)])
+
+
+def list_validators(request, queryset, serializer_class, paginator=None):
+    """(etag, last_modified) for a list, per query string.
+
+    With a KeysetPagination ``paginator`` only the requested page is looked at (its
+    ids and updated_at plus its children's), so the cost is bounded by the page size
+    whatever the size of the table. Without one the whole list is aggregated.
+    """
+    if not _has_updated_at(queryset.model):
+        return None
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if paginator is None:
+        queryset = queryset.order_by()
+        aggregates = queryset.aggregate(count=Count('pk'), latest=Max('updated_at'))
+        parents, timestamps = queryset.values('pk'), [aggregates['latest']]
+        # The count catches rows leaving the list without a newer updated_at showing up
+        members = aggregates['count']
+    else:
+        rows = list(paginator.page_queryset(queryset, request).values_list('pk', 'updated_at'))
+        parents, timestamps = [pk for pk, _ in rows], [updated_at for _, updated_at in rows]
+        # The page's ids catch rows shifting in or out of the page
+        members = ','.join(map(str, parents))
+    # One extra aggregate per nested relation (none for the flat resources); the
+    # child counts catch children moved away or hard-deleted, as in detail_validators
+    for related_model, lookup in nested_relations(serializer_class):
+        rows = related_model.all_objects.filter(**{f'{lookup}__in': parents})
+        children = rows.aggregate(latest=Max('updated_at'), count=Count('pk'))
+        timestamps.append(children['latest'])
+        members = f'{members}|{children["count"]}'
+    key = f'{request.get_full_path()}|{members}'
+    return _validators(key, timestamps)
+
+
+def not_modified(request, validators):
+    """Return a 304 response if the client's copy is current, else None."""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, validators):
+    if validators is not None:
+        etag, last_modified = validators
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
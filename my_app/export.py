@@ -0,0 +1,64 @@
+import zlib
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Profile, Episode, Trigger, Behavior, Intervention, Session
+
+
+# Bulk export as gzip-compressed NDJSON. Every line is one row,
+#
+#     {"resource": "episodes", "row": {"id": 1, "profile_id": 3, ...}}
+#
+# with the raw column values (FKs as <name>_id). Resources are written parents
+# first, so the archive can be replayed in order by import_records. Rows are read
+# with chunked server-side cursors (.values().iterator()) and compressed as they are
+# produced, so memory stays flat however many rows are exported.
+EXPORT_RESOURCES = [
+    ('profiles', Profile, 'id'),
+    ('episodes', Episode, 'profile_id'),
+    ('triggers', Trigger, 'profile_id'),
+    ('behaviors', Behavior, 'profile_id'),
+    ('interventions', Intervention, 'profile_id'),
+    ('sessions', Session, 'profile_id'),
+]
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds; an archive keeps them exact
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def iter_export_lines(profile_ids=None, chunk_size=None):
+    """Yield (resource, encoded NDJSON line) for every live row; ``profile_ids`` limits the export."""
+    chunk_size = chunk_size or getattr(settings, 'API_STREAM_CHUNK_SIZE', 500)
+    encoder = ExportEncoder(ensure_ascii=False, separators=(',', ':'))
+    for name, model, profile_field in EXPORT_RESOURCES:
+        queryset = model.objects.order_by('pk')
+        if profile_ids is not None:
+            queryset = queryset.filter(**{f'{profile_field}__in': profile_ids})
+        for row in queryset.values(*export_columns(model)).iterator(chunk_size=chunk_size):
+            yield name, (encoder.encode({'resource': name, 'row': row}) + '\n').encode()
+
+
+def iter_gzip(lines, level=6, flush_bytes=64 * 1024):
+    """Gzip-compress ``lines`` incrementally, yielding a compressed chunk per ~flush_bytes of input."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # gzip container
+    pending = 0
+    for line in lines:
+        chunk = compressor.compress(line)
+        pending += len(line)
+        if pending >= flush_bytes:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if chunk:
+            yield chunk
+    yield compressor.flush()
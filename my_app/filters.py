@@ -0,0 +1,131 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_duration
+from rest_framework import serializers
+
+from .models import Episode, Trigger, Behavior, Intervention, Session
+
+
+# Server-side list filters. Each resource maps query parameters to ORM lookups plus a
+# parser for the raw value; the lookups line up with the (profile, ...) composite
+# indexes on the models, so a profile-scoped filtered list is a single index range scan.
+#
+# Date ranges use <field>_after / <field>_before (both inclusive).
+#
+# LIST_ORDERINGS lists the columns a resource can be sorted by with ?ordering=-<field>.
+# Lists are keyset-paginated newest/largest first, so only descending orders exist.
+
+
+def _integer(value):
+    return int(value)
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def _datetime(value):
+    # Accept a full timestamp or a bare date (midnight); naive values are in TIME_ZONE
+    parsed = parse_datetime(value) or datetime.combine(_date(value), time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _duration(value):
+    # Seconds ("90"), [DD ][HH:[MM:]]ss[.uuuuuu] or ISO 8601 ("PT1H30M")
+    parsed = parse_duration(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def _exact(param, lookup, parse=str):
+    return {param: (lookup, parse)}
+
+
+def _range(field, parse):
+    return {
+        f'{field}_after': (f'{field}__gte', parse),
+        f'{field}_before': (f'{field}__lte', parse),
+    }
+
+
+LIST_FILTERS = {
+    Episode: {
+        **_exact('profile', 'profile_id', _integer),
+        **_exact('severity', 'severity'),
+        **_range('episode_date', _date),
+        **_range('start_time', _datetime),
+        'min_duration': ('duration__gte', _duration),
+        'max_duration': ('duration__lte', _duration),
+    },
+    Trigger: {
+        **_exact('profile', 'profile_id', _integer),
+        **_exact('episode', 'episode_id', _integer),
+        **_exact('severity', 'severity'),
+        **_exact('trigger_type', 'trigger_type'),
+    },
+    Behavior: {
+        **_exact('profile', 'profile_id', _integer),
+        **_exact('episode', 'episode_id', _integer),
+        **_exact('behavior_type', 'behavior_type'),
+    },
+    Intervention: {
+        **_exact('profile', 'profile_id', _integer),
+        **_exact('episode', 'episode_id', _integer),
+    },
+    Session: {
+        **_exact('profile', 'profile_id', _integer),
+        **_range('session_date', _date),
+    },
+}
+
+
+LIST_ORDERINGS = {
+    Episode: ['created_at', 'start_time', 'duration'],
+}
+
+
+def requested_ordering(request, model, default='created_at'):
+    """The column named by ?ordering=-<field>, if the model allows it; otherwise a 400."""
+    value = getattr(request, 'query_params', request.GET).get('ordering')
+    if value in (None, ''):
+        return default
+    allowed = LIST_ORDERINGS.get(model, [default])
+    if not value.startswith('-') or value[1:] not in allowed:
+        choices = ', '.join(f'-{field}' for field in allowed)
+        raise serializers.ValidationError({'ordering': [f'Expected one of: {choices}']})
+    return value[1:]
+
+
+def filter_queryset(queryset, request):
+    """Apply the model's LIST_FILTERS found in the query string; bad values raise a 400."""
+    params = getattr(request, 'query_params', request.GET)
+    lookups, errors = {}, {}
+    for param, (lookup, parse) in LIST_FILTERS.get(queryset.model, {}).items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        try:
+            lookups[lookup] = parse(value)
+        except (TypeError, ValueError):
+            errors[param] = [f'Invalid value: {value!r}']
+    if errors:
+        raise serializers.ValidationError(errors)
+    return queryset.filter(**lookups)
+
+
+def parse_date_param(request, param):
+    """The ``param`` query parameter as a date (None when absent); bad values raise a 400."""
+    value = getattr(request, 'query_params', request.GET).get(param)
+    if value in (None, ''):
+        return None
+    try:
+        return _date(value)
+    except ValueError:
+        raise serializers.ValidationError({param: [f'Invalid value: {value!r}']})
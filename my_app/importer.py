@@ -0,0 +1,300 @@
+import csv
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.duration import duration_iso_string
+from rest_framework import serializers
+
+from .bulk import _validate_items
+from .caching import invalidate
+from .models import Profile, Episode
+from .my_serializers import (
+    ProfileSyncSerializer, EpisodeSerializer, TriggerSerializer, BehaviorSerializer,
+    InterventionSerializer, SessionSerializer,
+)
+from .scoping import forget_profile_ids
+
+
+# Bulk import of legacy records (CSV or JSONL, optionally gzipped -- export_records
+# archives can be fed back in as they are).
+#
+# Rows are validated a batch at a time with the API serializers, FK ids being
+# resolved with one in_bulk() per relation (bulk.PreloadedRelatedField), and
+# inserted with bulk_create -- or COPY on PostgreSQL/psycopg2 -- one transaction per
+# batch. Incoming "id" values are treated as legacy ids: rows get fresh ids and
+# later rows referencing them are translated through per-resource id maps; a
+# reference missing from the maps rejects the row unless allow_existing_ids says
+# such values are ids of rows already in the database. Legacy created_at and
+# timestamp values are kept (auto_now_add is switched off for the insert), but
+# updated_at is the import time: sync positions and Last-Modified are built on it,
+# so a backdated row would land behind every client's sync token and never be sent.
+#
+# Progress goes to an append-only checkpoint log (one line per committed batch:
+# source offset plus the legacy -> new ids it created), so an interrupted import
+# resumes after the last committed batch with its id maps intact. A crash between a
+# commit and its log line replays that one batch.
+
+
+class EpisodeImportSerializer(EpisodeSerializer):
+    # Legacy exports carry notes, which the API serializer leaves out
+    class Meta(EpisodeSerializer.Meta):
+        fields = EpisodeSerializer.Meta.fields + ['notes']
+
+
+# resource -> (serializer, {FK field: resource whose id map translates it})
+IMPORT_RESOURCES = {
+    'profiles': (ProfileSyncSerializer, {}),
+    'episodes': (EpisodeImportSerializer, {'profile': 'profiles'}),
+    'triggers': (TriggerSerializer, {'profile': 'profiles', 'episode': 'episodes'}),
+    'behaviors': (BehaviorSerializer, {'profile': 'profiles', 'episode': 'episodes'}),
+    'interventions': (InterventionSerializer, {'profile': 'profiles', 'episode': 'episodes', 'behavior': 'behaviors'}),
+    'sessions': (SessionSerializer, {'profile': 'profiles'}),
+}
+
+
+def auto_timestamp_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+
+
+@contextmanager
+def historic_timestamps(*models):
+    # bulk_create (and pre_save in _copy_insert) apply auto_now / auto_now_add, which
+    # would stamp every row with the current time; switch them off so history is kept
+    fields = [field for model in models for field in auto_timestamp_fields(model)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ImportFailed(Exception):
+    """Unusable input (unknown resource, missing --resource for plain rows, bad JSON)."""
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(path, resource=None):
+    """Yield (offset, resource, row) from a CSV or JSONL file.
+
+    JSONL lines are either plain row objects (``resource`` required) or export_records
+    lines of the form {"resource": ..., "row": {...}}. CSV files hold one resource.
+    """
+    is_csv = path.endswith(('.csv', '.csv.gz'))
+    with _open_text(path) as handle:
+        if is_csv:
+            if resource is None:
+                raise ImportFailed(f'{path}: --resource is required for CSV input')
+            for offset, row in enumerate(csv.DictReader(handle)):
+                # Empty CSV cells mean "not given"
+                yield offset, resource, {key: value for key, value in row.items() if value != ''}
+            return
+        for offset, line in enumerate(handle):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise ImportFailed(f'{path}:{offset + 1}: invalid JSON ({exc})')
+            if isinstance(record, dict) and 'resource' in record and 'row' in record:
+                yield offset, record['resource'], record['row']
+            elif resource is None:
+                raise ImportFailed(f'{path}:{offset + 1}: plain rows need --resource')
+            else:
+                yield offset, resource, record
+
+
+class Checkpoint:
+    """Append-only log of committed batches: source offsets and the id maps they built."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}
+        self.id_maps = {name: {} for name in IMPORT_RESOURCES}
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as handle:
+            for line in handle:
+                entry = json.loads(line)
+                self.offsets[entry['source']] = entry['offset']
+                for name, pairs in entry['ids'].items():
+                    self.id_maps[name].update(pairs)
+
+    def record(self, source, offset, resource, pairs):
+        self.offsets[source] = offset
+        self.id_maps[resource].update(pairs)
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps({'source': source, 'offset': offset, 'ids': {resource: pairs}}) + '\n')
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def _uses_copy():
+    return connection.vendor == 'postgresql' and connection.Database.__name__ == 'psycopg2'
+
+
+def _copy_value(field, instance):
+    value = field.get_db_prep_save(field.pre_save(instance, add=True), connection)
+    if value is None:
+        return r'\N'
+    if isinstance(value, timedelta):
+        return duration_iso_string(value)
+    return value
+
+
+def _copy_insert(model, instances):
+    # COPY cannot return ids, so they are drawn from the table's sequence first
+    table = model._meta.db_table
+    fields = model._meta.concrete_fields
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [table, model._meta.pk.column, len(instances)],
+        )
+        for instance, (pk,) in zip(instances, cursor.fetchall()):
+            instance.pk = pk
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for instance in instances:
+            writer.writerow([_copy_value(field, instance) for field in fields])
+        buffer.seek(0)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        cursor.cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+
+
+class Importer:
+    def __init__(self, checkpoint, batch_size=1000, use_copy=None, errors=None, allow_existing_ids=False):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.use_copy = _uses_copy() if use_copy is None else use_copy
+        self.errors = errors  # Writable text file for rejected rows, or None
+        # Unmapped references are ids of existing rows rather than unknown legacy ids
+        self.allow_existing_ids = allow_existing_ids
+        self.imported = {name: 0 for name in IMPORT_RESOURCES}
+        self.rejected = {name: 0 for name in IMPORT_RESOURCES}
+
+    def _translate(self, resource, row):
+        """Split a raw row into (legacy id, serializer data, historic timestamps, errors)."""
+        row = dict(row)
+        legacy_id = row.pop('id', None)
+        row.pop('is_deleted', None)
+        errors = {}
+        for field, target in IMPORT_RESOURCES[resource][1].items():
+            # Accept both "profile" and the exported column name "profile_id"
+            value = row.pop(f'{field}_id', row.get(field))
+            if value is None:
+                continue
+            new_id = self.checkpoint.id_maps[target].get(str(value))
+            if new_id is not None:
+                row[field] = new_id
+            elif self.allow_existing_ids:
+                row[field] = value
+            else:
+                errors[field] = [f'No imported {target} row with legacy id {value}']
+        if resource == 'profiles' and 'user_id' in row:
+            row['user'] = row.pop('user_id')
+
+        timestamps = {}
+        for field in auto_timestamp_fields(IMPORT_RESOURCES[resource][0].Meta.model):
+            value = row.pop(field.name, None)
+            if value is None or field.auto_now:
+                continue
+            try:
+                timestamps[field.name] = serializers.DateTimeField().run_validation(value)
+            except serializers.ValidationError as exc:
+                errors[field.name] = exc.detail
+        return legacy_id, row, timestamps, errors
+
+    def import_batch(self, source, resource, batch):
+        """Validate and insert one batch of (offset, row); returns the number inserted."""
+        serializer_class, _ = IMPORT_RESOURCES[resource]
+        translated = [self._translate(resource, row) for _, row in batch]
+        errors = [{'index': index, 'errors': entry[3]} for index, entry in enumerate(translated) if entry[3]]
+        candidates = [index for index, entry in enumerate(translated) if not entry[3]]
+        rows = [translated[index][1] for index in candidates]
+        serializer = serializer_class(data=rows, many=True)
+        valid, validation_errors = _validate_items(serializer, rows)
+        errors.extend({**error, 'index': candidates[error['index']]} for error in validation_errors)
+        errors.sort(key=lambda error: error['index'])
+        valid = [(candidates[position], data) for position, data in valid]
+
+        model = serializer.child.Meta.model
+        now = timezone.now()
+        instances = []
+        for index, data in valid:
+            instance = model(**data)
+            # updated_at, and any legacy value the row lacks, is what auto_now(_add) would set
+            for field in auto_timestamp_fields(model):
+                setattr(instance, field.name, translated[index][2].get(field.name, now))
+            if isinstance(instance, Episode):
+                instance.update_duration()  # bulk inserts skip Episode.save()
+            instances.append(instance)
+
+        with transaction.atomic(), historic_timestamps(model):
+            if self.use_copy:
+                _copy_insert(model, instances)
+            else:
+                model.objects.bulk_create(instances)
+            profile_ids = [instance.pk if model is Profile else instance.profile_id for instance in instances]
+            invalidate(model, profile_ids=profile_ids)
+        if model is Profile:
+            forget_profile_ids(*{instance.user_id for instance in instances})
+
+        pairs = {
+            str(translated[index][0]): instance.pk
+            for (index, _), instance in zip(valid, instances)
+            if translated[index][0] is not None
+        }
+        self.checkpoint.record(source, batch[-1][0] + 1, resource, pairs)
+
+        self.imported[resource] += len(instances)
+        self.rejected[resource] += len(errors)
+        if self.errors is not None:
+            for error in errors:
+                offset = batch[error['index']][0]
+                self.errors.write(json.dumps({'source': source, 'offset': offset, 'errors': error['errors']}) + '\n')
+        return len(instances)
+
+    def import_file(self, path, resource=None, progress=None):
+        """Import one file, skipping records already covered by the checkpoint."""
+        if resource is not None and resource not in IMPORT_RESOURCES:
+            raise ImportFailed(f'Unknown resource {resource!r}')
+        source = os.path.abspath(path)
+        start = self.checkpoint.offsets.get(source, 0)
+        batch, batch_resource = [], None
+        for offset, row_resource, row in read_records(path, resource):
+            if offset < start:
+                continue
+            if row_resource not in IMPORT_RESOURCES:
+                raise ImportFailed(f'{path}:{offset + 1}: unknown resource {row_resource!r}')
+            # Batches hold one resource, so parents are committed before their children
+            if batch and (row_resource != batch_resource or len(batch) >= self.batch_size):
+                self.import_batch(source, batch_resource, batch)
+                if progress:
+                    progress(self)
+                batch = []
+            batch_resource = row_resource
+            batch.append((offset, row))
+        if batch:
+            self.import_batch(source, batch_resource, batch)
+            if progress:
+                progress(self)
@@ -0,0 +1,444 @@
+import gc
+import json
+import os
+import re
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from my_app import caching
+from my_app.models import Profile, Episode, Trigger, Behavior, Intervention, Session, School, Therapist
+from my_app.my_serializers import (
+    ProfileSerializer, EpisodeSerializer, TriggerSerializer, BehaviorSerializer, InterventionSerializer,
+    SessionSerializer, SchoolSerializer, TherapistSerializer,
+)
+from my_app.scoping import forget_profile_ids
+
+
+# Endpoint benchmark with budgets. Every route of the URLconf is driven in-process
+# through the full middleware stack (rest_framework's APIClient) against the current
+# database -- seed it first with seed_data. Per case it records p50/p95/p99 latency,
+# the queries of one steady-state request and the response size, and compares them
+# with a stored baseline: any extra query, or latency / size beyond the tolerances,
+# is a regression. List endpoints are also probed at page_size=1 and the full page
+# size; a query count that grows with the page is an N+1 whatever the baseline says.
+#
+# Everything runs in one transaction that is rolled back, so creates, updates and
+# deletes leave the data as it was. Cache version bumps are deferred to commit and
+# therefore never happen; the payloads cached during the run are invalidated
+# afterwards instead.
+#
+# The committed bench_endpoints.baseline.json was recorded on a fresh database
+# seeded with BASELINE_DATASET (the command line is stored in the file); seed the
+# same way before comparing against it. Query counts and sizes carry over between
+# machines, latencies do not: re-record with --save-baseline where the check runs.
+
+BASELINE_DATASET = 'manage.py migrate && manage.py seed_data --users 500 --seed 1'
+
+
+def _at(value, index):
+    return value(index) if callable(value) else value
+
+
+class Case:
+    """One benchmarked request; ``kwargs``, ``data``, ``user`` and ``auth`` may be callables of the iteration.
+
+    Requests are sent as ``user`` (default: the fixture owner) unless ``auth`` gives the
+    Authorization header itself.
+    """
+
+    def __init__(self, name, method, route, kwargs=None, data=None, user=None, auth=None, paged=False):
+        self.name = name
+        self.method = method
+        self.route = route
+        self.kwargs = kwargs or {}
+        self.data = data
+        self.user = user
+        self.auth = auth
+        self.paged = paged
+
+    def path(self, index):
+        kwargs = _at(self.kwargs, index)
+        return '/' + re.sub(r'<(?:\w+:)?(\w+)>', lambda match: str(kwargs[match.group(1)]), self.route)
+
+
+def _payload(serializer_class, instance):
+    # The writable fields of an existing row: a valid create / full update body
+    serializer = serializer_class(instance)
+    return {name: value for name, value in serializer.data.items() if not serializer.fields[name].read_only}
+
+
+def _copies(instance, count):
+    """Ids of ``count`` fresh copies of ``instance`` (rows for the delete cases to consume)."""
+    model = type(instance)
+    values = {field.attname: getattr(instance, field.attname)
+              for field in model._meta.concrete_fields if not field.primary_key}
+    return [row.pk for row in model.objects.bulk_create([model(**values) for _ in range(count)])]
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def url_routes():
+    """Route strings of the project URLconf (included URLconfs such as the admin are skipped)."""
+    return [str(pattern.pattern) for pattern in get_resolver().url_patterns if isinstance(pattern, URLPattern)]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every API route against the current database (seed it with seed_data) and fail '
+            'when latency, queries per request or response size regress against the stored baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default='bench_endpoints.baseline.json', help='Baseline JSON file.')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write this run as the new baseline instead of comparing against it.')
+        parser.add_argument('--dataset', default=BASELINE_DATASET,
+                            help='How the database was seeded; stored in a saved baseline.')
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per case.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per case before timing.')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--bulk-size', type=int, default=20, help='Items per bulk create/update/delete body.')
+        parser.add_argument('--username', default=None,
+                            help='Owner whose profiles are exercised (default: owner of the first intervention).')
+        parser.add_argument('--cases', nargs='+', default=None, help='Only run cases whose name contains one of these.')
+        parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                            help='Allowed relative p50/p95 increase over the baseline.')
+        parser.add_argument('--latency-slack', type=float, default=2.0,
+                            help='Allowed absolute p50/p95 increase (ms), absorbing noise on fast endpoints.')
+        parser.add_argument('--bytes-tolerance', type=float, default=0.10,
+                            help='Allowed relative response size increase over the baseline.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if not options['save_baseline'] and os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+            if baseline['page_size'] != options['page_size'] or baseline['bulk_size'] != options['bulk_size']:
+                raise CommandError(f'{options["baseline"]} was recorded with --page-size {baseline["page_size"]} '
+                                   f'--bulk-size {baseline["bulk_size"]}; use the same values')
+            if baseline.get('dataset'):
+                self.stdout.write(f'Baseline recorded on: {baseline["dataset"]}')
+
+        self.options = options
+        # Server errors are reported as failing cases rather than raised
+        self.client = APIClient(raise_request_exception=False)
+        self.tokens = {}
+        # Warmup, timed and the two query-counted requests
+        self.requests_per_case = options['warmup'] + options['iterations'] + 2
+        results, failures = {}, []
+
+        with transaction.atomic():
+            fixture = self.fixture(options['username'])
+            self.owner = fixture['owner']
+            cases = self.cases(fixture)
+            covered = {case.route for case in cases}
+            if options['cases']:
+                cases = [case for case in cases if any(part in case.name for part in options['cases'])]
+            self.stdout.write(f'{"case":<28} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8} {"bytes":>9}')
+            for case in cases:
+                result, problems = self.run_case(case)
+                results[case.name] = result
+                problems += self.compare(case.name, result, baseline)
+                failures += [f'{case.name}: {problem}' for problem in problems]
+                self.stdout.write(
+                    f'{case.name:<28} {result["p50"]:>8.2f} {result["p95"]:>8.2f} {result["p99"]:>8.2f} '
+                    f'{result["queries"]:>8} {result["bytes"]:>9}' + (f'  {"; ".join(problems)}' if problems else '')
+                )
+            transaction.set_rollback(True)
+        self.forget_cached(fixture)
+
+        for route in url_routes():
+            if route not in covered:
+                self.stdout.write(self.style.WARNING(f'No benchmark case for route {route!r}'))
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as handle:
+                json.dump({'dataset': options['dataset'], 'page_size': options['page_size'],
+                           'bulk_size': options['bulk_size'], 'cases': results}, handle, indent=2, sort_keys=True)
+                handle.write('\n')
+            self.stdout.write(f'Saved {len(results)} cases to {options["baseline"]}')
+        elif baseline is None:
+            self.stdout.write(f'No baseline at {options["baseline"]}; run with --save-baseline to record one')
+
+        if failures:
+            raise CommandError(f'{len(failures)} budget regression(s):\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} cases within budget'))
+
+    def fixture(self, username):
+        user_model = get_user_model()
+        interventions = Intervention.objects.select_related('behavior', 'episode', 'profile__user').order_by('pk')
+        if username is not None:
+            interventions = interventions.filter(profile__user__username=username)
+        intervention = interventions.first()
+        if intervention is None:
+            raise CommandError('No interventions to benchmark with; seed the database first (manage.py seed_data)')
+        profile = intervention.profile
+        trigger = Trigger.objects.filter(profile=profile).order_by('pk').first()
+        session = Session.objects.filter(profile=profile).order_by('pk').first()
+        school, therapist = School.objects.order_by('pk').first(), Therapist.objects.order_by('pk').first()
+        if None in (trigger, session, school, therapist):
+            raise CommandError('The dataset needs triggers and sessions for the profile, a school and a therapist; '
+                               'seed it with manage.py seed_data')
+
+        # Throwaway accounts: one to log in with, one to update, one per user deletion
+        count = self.requests_per_case
+        password = 'bench-password'
+        encoded = make_password(password)
+        users = user_model.objects.bulk_create([
+            user_model(username=f'bench-{index}', email=f'bench-{index}@example.com', password=encoded,
+                       first_name='Bench', last_name='User', user_type=profile.user.user_type)
+            for index in range(count + 2)
+        ])
+        return {
+            'owner': profile.user, 'profile': profile, 'episode': intervention.episode, 'trigger': trigger,
+            'behavior': intervention.behavior, 'intervention': intervention, 'session': session,
+            'school': school, 'therapist': therapist, 'password': password,
+            'login_user': users[0], 'update_user': users[1], 'delete_users': users[2:],
+        }
+
+    def cases(self, fx):
+        count, bulk_size = self.requests_per_case, self.options['bulk_size']
+        owner, profile, episode = fx['owner'], fx['profile'], fx['episode']
+        login = {'username': fx['login_user'].username, 'password': fx['password']}
+        refresh_tokens = [RefreshToken.for_user(fx['login_user']) for _ in range(2 * count)]
+        cases = [
+            Case('login', 'POST', 'api/token/login', data=login),
+            Case('login_async', 'POST', 'api/token/login/async', data=login),
+            Case('token_refresh', 'POST', 'api/token/refresh/', data=lambda i: {'refresh': str(refresh_tokens[i])}),
+            # Logout also revokes the access token it is sent with, so each one brings its own
+            Case('logout', 'POST', 'api/token/logout/', data=lambda i: {'refresh': str(refresh_tokens[count + i])},
+                 auth=lambda i: f'Bearer {refresh_tokens[count + i].access_token}'),
+        ]
+
+        # Profiles and the nested per-profile reads
+        profile_body = _payload(ProfileSerializer, profile)
+        profile_ids = iter(_copies(profile, count))
+        cases += [
+            Case('profile_create', 'POST', 'api/v1/create_profile', data={**profile_body, 'user_id': owner.pk}),
+            Case('profile_list', 'GET', 'api/v1/profile', paged=True),
+            Case('profile_detail', 'GET', 'api/v1/profile/<int:profile_id>', {'profile_id': profile.pk}),
+            Case('profile_update', 'PUT', 'api/v1/profile/update/<int:profile_id>', {'profile_id': profile.pk},
+                 data=profile_body),
+            Case('profile_delete', 'DELETE', 'api/v1/profile/delete/<int:profile_id>',
+                 lambda i: {'profile_id': next(profile_ids)}),
+            Case('profile_timeline', 'GET', 'api/v1/profile/<int:profile_id>/timeline', {'profile_id': profile.pk}),
+            Case('profile_analytics', 'GET', 'api/v1/profile/<int:profile_id>/analytics', {'profile_id': profile.pk}),
+        ]
+        for children in ('episodes', 'triggers', 'behaviors', 'interventions', 'sessions'):
+            cases.append(Case(f'profile_{children}', 'GET', f'api/v1/profile/<int:profile_id>/{children}',
+                              {'profile_id': profile.pk}, paged=True))
+
+        # Owned child resources: create / list / detail / update / delete plus the bulk routes
+        resources = [
+            ('trigger', fx['trigger'], TriggerSerializer, 'description'),
+            ('behavior', fx['behavior'], BehaviorSerializer, 'description'),
+            ('intervention', fx['intervention'], InterventionSerializer, 'description'),
+            ('session', fx['session'], SessionSerializer, 'notes'),
+        ]
+        for name, instance, serializer_class, text_field in resources:
+            body = _payload(serializer_class, instance)
+            lookup = {f'{name}_id': instance.pk}
+            bulk_rows = _copies(instance, bulk_size)
+            bulk_ids = iter(_copies(instance, count * bulk_size))
+            cases += [
+                Case(f'{name}_create', 'POST', f'api/v1/{name}/create', data=body),
+                Case(f'{name}_list', 'GET', f'api/v1/{name}', paged=True),
+                Case(f'{name}_detail', 'GET', f'api/v1/{name}/<int:{name}_id>', lookup),
+                Case(f'{name}_update', 'PUT', f'api/v1/{name}/update/<int:{name}_id>', lookup, data=body),
+                Case(f'{name}_bulk_create', 'POST', f'api/v1/{name}/bulk/create', data=[body] * bulk_size),
+                Case(f'{name}_bulk_update', 'PUT', f'api/v1/{name}/bulk/update',
+                     data=[{'id': pk, text_field: 'Benchmarked'} for pk in bulk_rows]),
+                Case(f'{name}_bulk_delete', 'DELETE', f'api/v1/{name}/bulk/delete',
+                     data=lambda i, ids=bulk_ids: [next(ids) for _ in range(bulk_size)]),
+            ]
+            if name != 'session':  # Sessions have no single delete route
+                delete_ids = iter(_copies(instance, count))
+                cases.append(Case(f'{name}_delete', 'DELETE', f'api/v1/{name}/delete/<int:{name}_id>',
+                                  lambda i, ids=delete_ids, key=f'{name}_id': {key: next(ids)}))
+
+        # Episodes
+        episode_body = _payload(EpisodeSerializer, episode)
+        behavior, intervention = fx['behavior'], fx['intervention']
+        ingest_body = {
+            **episode_body,
+            'triggers': [{field: getattr(fx['trigger'], field)
+                          for field in ('trigger_type', 'description', 'severity', 'management_strategy')}],
+            'behaviors': [{'ref': 'b1', 'behavior_type': behavior.behavior_type, 'description': behavior.description,
+                           'frequency': behavior.frequency, 'context': behavior.context}],
+            'interventions': [{'behavior_ref': 'b1', 'intervention_type': intervention.intervention_type,
+                               'description': intervention.description,
+                               'effectiveness': intervention.effectiveness}],
+        }
+        episode_ids = iter(_copies(episode, count))
+        cases += [
+            Case('episode_create', 'POST', 'api/v1/episode/create', data=episode_body),
+            Case('episode_ingest', 'POST', 'api/v1/episode/ingest', data=ingest_body),
+            Case('episode_list', 'GET', 'api/v1/episode', paged=True),
+            Case('episode_detail', 'GET', 'api/v1/episode/<int:episode_id>', {'episode_id': episode.pk}),
+            Case('episode_update', 'PUT', 'api/v1/episode/update/<int:episode_id>', {'episode_id': episode.pk},
+                 data=episode_body),
+            Case('episode_delete', 'DELETE', 'api/v1/episode/delete/<int:episode_id>',
+                 lambda i: {'episode_id': next(episode_ids)}),
+        ]
+
+        # Users: updates and deletions act on throwaway accounts, as themselves
+        update_user, delete_users = fx['update_user'], fx['delete_users']
+        cases += [
+            Case('user_create', 'POST', 'api/v1/user/create', data=lambda i: {
+                'username': f'bench-new-{i}', 'email': f'bench-new-{i}@example.com', 'password': fx['password'],
+                'first_name': 'Bench', 'last_name': 'User', 'user_type': owner.user_type,
+            }),
+            Case('user_list', 'GET', 'api/v1/user', paged=True),
+            Case('user_me', 'GET', 'api/v1/user/me'),
+            Case('user_detail', 'GET', 'api/v1/user/<int:user_id>', {'user_id': owner.pk}),
+            Case('user_update', 'PUT', 'api/v1/user/update/<int:user_id>', {'user_id': update_user.pk},
+                 user=update_user, data={
+                     'username': update_user.username, 'email': update_user.email, 'password': fx['password'],
+                     'first_name': 'Bench', 'last_name': 'Updated', 'user_type': update_user.user_type,
+                 }),
+            Case('user_delete', 'DELETE', 'api/v1/user/delete/<int:user_id>',
+                 lambda i: {'user_id': delete_users[i].pk}, user=lambda i: delete_users[i]),
+        ]
+
+        # Schools and therapists (not owner-scoped)
+        for name, instance, serializer_class in (('school', fx['school'], SchoolSerializer),
+                                                 ('therapist', fx['therapist'], TherapistSerializer)):
+            body = _payload(serializer_class, instance)
+            delete_ids = iter(_copies(instance, count))
+            cases += [
+                Case(f'{name}_create', 'POST', f'api/v1/{name}/create', data=body),
+                Case(f'{name}_list', 'GET', f'api/v1/{name}/', paged=True),
+                Case(f'{name}_detail', 'GET', f'api/v1/{name}/<int:{name}_id>', {f'{name}_id': instance.pk}),
+                Case(f'{name}_update', 'PUT', f'api/v1/{name}/update/<int:{name}_id>', {f'{name}_id': instance.pk},
+                     data=body),
+                Case(f'{name}_delete', 'DELETE', f'api/v1/{name}/delete/<int:{name}_id>',
+                     lambda i, ids=delete_ids, key=f'{name}_id': {key: next(ids)}),
+            ]
+
+        cases += [
+            Case('sync', 'GET', 'api/v1/sync', data={'profile': profile.pk}),
+            Case('export', 'GET', 'api/v1/export'),
+            Case('cache_stats', 'GET', 'api/v1/cache/stats'),
+            Case('metrics', 'GET', 'metrics'),
+        ]
+
+        # Async read views
+        async_lookups = {
+            'profile': profile.pk, 'trigger': fx['trigger'].pk, 'behavior': behavior.pk,
+            'intervention': intervention.pk, 'episode': episode.pk, 'user': owner.pk, 'session': fx['session'].pk,
+            'school': fx['school'].pk, 'therapist': fx['therapist'].pk,
+        }
+        for name, pk in async_lookups.items():
+            cases += [
+                Case(f'async_{name}_list', 'GET', f'api/v1/async/{name}', paged=True),
+                Case(f'async_{name}_detail', 'GET', f'api/v1/async/{name}/<int:{name}_id>', {f'{name}_id': pk}),
+            ]
+        return cases
+
+    def request(self, case, index, query=None):
+        auth = _at(case.auth, index)
+        if auth is None:
+            user = _at(case.user, index) or self.owner
+            if user.pk not in self.tokens:
+                self.tokens[user.pk] = f'Bearer {AccessToken.for_user(user)}'
+            auth = self.tokens[user.pk]
+        data = _at(case.data, index)
+        if case.method == 'GET':
+            data = {**(data or {}), **(query or {})}
+            if case.paged:
+                data.setdefault('page_size', self.options['page_size'])
+        response = getattr(self.client, case.method.lower())(
+            case.path(index), data, format=None if case.method == 'GET' else 'json',
+            HTTP_AUTHORIZATION=auth,
+        )
+        # Streamed responses (exports, ?stream=1) are produced while they are read
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def run_case(self, case):
+        problems = []
+        index = 0
+        for _ in range(self.options['warmup']):
+            self.request(case, index)
+            index += 1
+        latencies, sizes = [], []
+        # As in timeit: collector pauses would otherwise land on random requests
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(self.options['iterations']):
+                started = time.perf_counter()
+                response, body = self.request(case, index)
+                latencies.append((time.perf_counter() - started) * 1000)
+                sizes.append(len(body))
+                index += 1
+                if not 200 <= response.status_code < 300 and not problems:
+                    problems.append(f'HTTP {response.status_code}: {body[:200].decode(errors="replace")}')
+        finally:
+            gc.enable()
+        queries, _ = self.count_queries(lambda attempt: self.request(case, index + attempt))
+        latencies.sort()
+        result = {
+            'p50': statistics.median(latencies), 'p95': _percentile(latencies, 0.95),
+            'p99': _percentile(latencies, 0.99), 'queries': queries, 'bytes': int(statistics.median(sizes)),
+        }
+        if case.paged:
+            problems += self.check_n_plus_one(case)
+        return result, problems
+
+    @staticmethod
+    def count_queries(send):
+        """(queries, result) of the cheaper of two ``send(attempt)`` calls."""
+        # Per-process state reloads on timers (revocation filter, JWT user state), and a
+        # reload can land in any one request: the fewer of two requests is the steady state
+        counts = []
+        for attempt in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                result = send(attempt)
+            counts.append((len(queries), result))
+        return min(counts, key=lambda count: count[0])
+
+    def check_n_plus_one(self, case):
+        # Distinct (unknown, ignored) probe parameters keep both requests out of the list cache
+        counts = []
+        for page_size in (1, self.options['page_size']):
+            queries, (response, body) = self.count_queries(lambda attempt: self.request(
+                case, 0, {'page_size': page_size, 'bench_probe': f'{page_size}-{attempt}'}
+            ))
+            counts.append((queries, len(json.loads(body).get('results', ())) if response.status_code == 200 else 0))
+        (small, _), (large, rows) = counts
+        if rows > 1 and large > small:
+            return [f'N+1: {small} queries for 1 row, {large} for {rows} rows']
+        return []
+
+    def compare(self, name, result, baseline):
+        if baseline is None or name not in baseline['cases']:
+            return []
+        before, options, problems = baseline['cases'][name], self.options, []
+        if result['queries'] > before['queries']:
+            problems.append(f'queries {before["queries"]} -> {result["queries"]}')
+        for key in ('p50', 'p95'):
+            limit = before[key] * (1 + options['latency_tolerance']) + options['latency_slack']
+            if result[key] > limit:
+                problems.append(f'{key} {before[key]:.2f} -> {result[key]:.2f} ms (budget {limit:.2f})')
+        limit = before['bytes'] * (1 + options['bytes_tolerance'])
+        if result['bytes'] > limit:
+            problems.append(f'bytes {before["bytes"]} -> {result["bytes"]} (budget {limit:.0f})')
+        return problems
+
+    def forget_cached(self, fixture):
+        # Outside the rolled-back transaction, so these bumps apply immediately
+        for model, key in ((Profile, 'profile'), (Episode, 'episode'), (Trigger, 'trigger'), (Behavior, 'behavior'),
+                           (Intervention, 'intervention'), (Session, 'session'), (School, 'school'),
+                           (Therapist, 'therapist')):
+            caching.invalidate(model, [fixture[key].pk], [fixture['profile'].pk])
+        forget_profile_ids(fixture['owner'].pk)
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from my_app.password_pool import PasswordHashPool
+
+
+class Command(BaseCommand):
+    help = 'Benchmark password verification: logins/sec inline vs. on the async hash pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Password checks per run.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent async logins.')
+        parser.add_argument('--workers', type=int, default=None, help='Hash pool threads (default: CPU count).')
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        encoded = make_password('correct horse battery staple')
+
+        # Baseline: checks run one after another on the calling thread (what a sync
+        # worker, or asgiref's single sync thread, does)
+        started = time.perf_counter()
+        for _ in range(logins):
+            check_password('correct horse battery staple', encoded)
+        inline_rate = logins / (time.perf_counter() - started)
+
+        pool = PasswordHashPool(workers=options['workers'], max_pending=logins)
+        pool_rate = asyncio.run(self._run_pool(pool, encoded, logins, options['concurrency']))
+        pool.executor.shutdown()
+
+        cores = min(pool.workers, os.cpu_count() or 1)
+        self.stdout.write(f'hasher:          {encoded.split("$", 1)[0]}')
+        self.stdout.write(f'inline:          {inline_rate:8.1f} logins/s (1 core)')
+        self.stdout.write(f'pool ({pool.workers} threads): {pool_rate:8.1f} logins/s, '
+                          f'{pool_rate / cores:.1f} logins/s per core over {cores} cores')
+
+    async def _run_pool(self, pool, encoded, logins, concurrency):
+        queue = asyncio.Queue()
+        for _ in range(logins):
+            queue.put_nowait(None)
+
+        async def client():
+            while not queue.empty():
+                queue.get_nowait()
+                await pool.run(check_password, 'correct horse battery staple', encoded)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return logins / (time.perf_counter() - started)
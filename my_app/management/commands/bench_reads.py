@@ -0,0 +1,107 @@
+import asyncio
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class Command(BaseCommand):
+    help = ('Load test the read endpoints through the ASGI handler: sync (/api/v1/...) vs. '
+            'async (/api/v1/async/...) views at increasing concurrency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', nargs='+', default=['profile', 'episode', 'trigger'],
+                            help='List endpoints to hit, e.g. profile episode school.')
+        parser.add_argument('--levels', default='1,8,32,128',
+                            help='Comma-separated concurrency levels.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per resource and level.')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--username', default=None,
+                            help='Send requests as this user (rows are owner-scoped; default: first superuser).')
+        parser.add_argument('--p95-budget', type=float, default=250.0,
+                            help='p95 latency (ms) a level must stay under to count towards the ceiling.')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['levels'].split(',')]
+        except ValueError:
+            raise CommandError('--levels must be a comma-separated list of integers')
+        user_model = get_user_model()
+        if options['username']:
+            user = user_model.objects.filter(username=options['username']).first()
+        else:
+            user = user_model.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --username or create a superuser')
+        headers = [(b'host', b'localhost'), (b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode())]
+        application = get_asgi_application()
+        budget = options['p95_budget']
+
+        for resource in options['resources']:
+            # school/therapist lists are routed with a trailing slash on the sync side
+            sync_path = f'/api/v1/{resource}' + ('/' if resource in ('school', 'therapist') else '')
+            routes = [('sync', sync_path), ('async', f'/api/v1/async/{resource}')]
+            self.stdout.write(f'\n{resource}')
+            self.stdout.write(f'  {"view":<6} {"conc":>5} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"errors":>7}')
+            for label, path in routes:
+                ceiling = None
+                for level in levels:
+                    rate, p50, p95, errors = asyncio.run(self._run(
+                        application, path, f'page_size={options["page_size"]}', headers, options['requests'], level,
+                    ))
+                    self.stdout.write(f'  {label:<6} {level:>5} {rate:>9.1f} {p50:>9.1f} {p95:>9.1f} {errors:>7}')
+                    if not errors and p95 <= budget:
+                        ceiling = level
+                self.stdout.write(f'  {label} ceiling (p95 <= {budget:.0f} ms, no errors): '
+                                  f'{ceiling if ceiling is not None else "below " + str(levels[0])}')
+
+    async def _run(self, application, path, query_string, headers, total, concurrency):
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+        latencies, errors = [], 0
+
+        async def client():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                status_code = await self._request(application, path, query_string, headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return total / elapsed, statistics.median(latencies), p95, errors
+
+    @staticmethod
+    async def _request(application, path, query_string, headers):
+        # Minimal ASGI HTTP exchange, so the numbers include Django's sync/async adaptation
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query_string.encode(), 'root_path': '',
+            'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        response = {}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Body already delivered: park until the handler cancels its disconnect watcher
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+
+        await application(scope, receive, send)
+        return response.get('status')
@@ -0,0 +1,44 @@
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from my_app.export import iter_export_lines, iter_gzip
+
+
+class Command(BaseCommand):
+    help = ('Export profiles, episodes, triggers, behaviors, interventions and sessions '
+            'as gzip-compressed NDJSON (one {"resource", "row"} object per line).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Archive path (e.g. export.ndjson.gz), or - for stdout.')
+        parser.add_argument('--profile', type=int, action='append', dest='profiles',
+                            help='Only export this profile (repeatable).')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per cursor round trip.')
+        parser.add_argument('--level', type=int, default=6, choices=range(1, 10), help='gzip compression level.')
+
+    def handle(self, *args, **options):
+        counts = Counter()
+
+        def lines():
+            for name, line in iter_export_lines(options['profiles'], options['chunk_size']):
+                counts[name] += 1
+                yield line
+
+        started = time.perf_counter()
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in iter_gzip(lines(), level=options['level']):
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        summary = ', '.join(f'{name}={count}' for name, count in counts.items()) or 'nothing'
+        self.stderr.write(f'Exported {total} rows ({summary}) in {elapsed:.2f}s, '
+                          f'{total / elapsed if elapsed else 0:.0f} rows/s, {written / 1024:.0f} KiB written')
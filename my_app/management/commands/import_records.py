@@ -0,0 +1,66 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.analytics import rebuild_rollups
+from my_app.importer import IMPORT_RESOURCES, Checkpoint, ImportFailed, Importer
+
+
+class Command(BaseCommand):
+    help = ('Bulk import legacy records from CSV or JSONL files (optionally .gz, e.g. export_records '
+            'archives), validated with the API serializers and inserted in batched transactions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Input files, imported in order (parents first).')
+        parser.add_argument('--resource', choices=sorted(IMPORT_RESOURCES),
+                            help='Resource of the rows in CSV files / plain JSONL rows.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per validation batch and transaction.')
+        parser.add_argument('--checkpoint', default='import_records.checkpoint.ndjson',
+                            help='Checkpoint log (source offsets and legacy -> new id maps).')
+        parser.add_argument('--resume', action='store_true', help='Continue from an existing checkpoint log.')
+        parser.add_argument('--errors', default=None, help='Write rejected rows and their errors (NDJSON) here.')
+        parser.add_argument('--allow-existing-ids', action='store_true',
+                            help='Treat references missing from the id maps as ids of rows already in the '
+                                 'database instead of rejecting those rows.')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL.')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild episode analytics rollups after importing episodes.')
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'])
+        if os.path.exists(checkpoint.path):
+            if not options['resume']:
+                raise CommandError(f'{checkpoint.path} exists: pass --resume to continue it, or remove it')
+            checkpoint.load()
+
+        errors = open(options['errors'], 'a', encoding='utf-8') if options['errors'] else None
+        importer = Importer(checkpoint, options['batch_size'], use_copy=False if options['no_copy'] else None,
+                            errors=errors, allow_existing_ids=options['allow_existing_ids'])
+        started = time.perf_counter()
+
+        def progress(importer):
+            total = sum(importer.imported.values())
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f'\r{total} rows, {total / elapsed if elapsed else 0:.0f} rows/s', ending='')
+
+        try:
+            for path in options['paths']:
+                importer.import_file(path, options['resource'], progress)
+        except ImportFailed as exc:
+            raise CommandError(str(exc))
+        finally:
+            if errors is not None:
+                errors.close()
+        self.stderr.write('')
+
+        elapsed = time.perf_counter() - started
+        total = sum(importer.imported.values())
+        method = 'COPY' if importer.use_copy else 'bulk_create'
+        self.stdout.write(f'Imported {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s, {method})')
+        for name in IMPORT_RESOURCES:
+            if importer.imported[name] or importer.rejected[name]:
+                self.stdout.write(f'  {name:<14} {importer.imported[name]:>9} imported {importer.rejected[name]:>7} rejected')
+
+        if importer.imported['episodes'] and not options['skip_rollups']:
+            self.stdout.write(f'Rebuilt {rebuild_rollups()} episode rollups')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from my_app.revocation import revocation_store
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked-token rows whose tokens have expired (run periodically, e.g. hourly from cron).'
+
+    def handle(self, *args, **options):
+        deleted = revocation_store.prune()
+        self.stdout.write(f'Pruned {deleted} expired revoked tokens')
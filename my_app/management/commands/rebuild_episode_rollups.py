@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from my_app.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute every EpisodeRollup (day / week / month) from the live episodes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rollup rows per INSERT.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt {created} rollups in {time.perf_counter() - started:.2f}s')
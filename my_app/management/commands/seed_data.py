@@ -0,0 +1,222 @@
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from my_app.analytics import rebuild_rollups
+from my_app.caching import invalidate
+from my_app.importer import _copy_insert, _uses_copy, historic_timestamps
+from my_app.models import (
+    CustomUser, Profile, Episode, Trigger, Behavior, Intervention, Session, School, Therapist,
+)
+
+SEVERITIES = [('Low', 50), ('Medium', 35), ('High', 15)]
+USER_TYPES = [(CustomUser.PARENT, 50), (CustomUser.GUARDIAN, 30), (CustomUser.AUTISTIC, 15), (CustomUser.THERAPIST, 5)]
+TRIGGER_TYPES = ['noise', 'crowds', 'transition', 'bright lights', 'routine change', 'hunger', 'fatigue', 'touch']
+BEHAVIOR_TYPES = ['meltdown', 'shutdown', 'stimming', 'elopement', 'aggression', 'self-injury', 'withdrawal']
+INTERVENTION_TYPES = ['deep pressure', 'quiet space', 'visual schedule', 'headphones', 'redirection', 'breathing']
+EFFECTIVENESS = ['not effective', 'somewhat effective', 'effective', 'very effective']
+SPECIALIZATIONS = ['speech therapy', 'occupational therapy', 'ABA', 'psychology', 'physiotherapy']
+# Episodes cluster in waking hours: weight per hour of day
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 1, 2, 5, 8, 8, 7, 7, 8, 8, 9, 10, 11, 11, 10, 8, 6, 4, 2, 1]
+
+
+class Generator:
+    """Deterministic row factory: every value comes from one seeded Random."""
+
+    def __init__(self, seed, end, days, episodes_per_profile):
+        self.rng = random.Random(seed)
+        self.end = timezone.make_aware(datetime.combine(end, datetime.min.time()))
+        self.days = days
+        # Log-normal episode counts: most profiles have a few, a long tail has hundreds
+        self.sigma = 1.1
+        self.mu = math.log(max(episodes_per_profile, 1)) - self.sigma ** 2 / 2
+
+    def weighted(self, choices):
+        values, weights = zip(*choices)
+        return self.rng.choices(values, weights)[0]
+
+    def moment(self):
+        day = self.end - timedelta(days=self.rng.randrange(self.days))
+        hour = self.rng.choices(range(24), HOUR_WEIGHTS)[0]
+        return day.replace(hour=hour, minute=self.rng.randrange(60), second=self.rng.randrange(60))
+
+    def episode_count(self):
+        return min(int(self.rng.lognormvariate(self.mu, self.sigma)), 5000)
+
+    def duration(self):
+        # Median ~20 minutes, occasionally a few hours
+        return timedelta(minutes=min(max(self.rng.lognormvariate(math.log(20), 0.8), 1), 240))
+
+
+class Command(BaseCommand):
+    help = ('Generate a deterministic synthetic dataset (users, profiles, episodes and their triggers, '
+            'behaviors, interventions, sessions, schools, therapists) with bulk inserts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--episodes-per-profile', type=float, default=40,
+                            help='Mean episodes per profile (log-normally skewed).')
+        parser.add_argument('--schools', type=int, default=None, help='Default: one per 200 users.')
+        parser.add_argument('--seed', type=int, default=1, help='Same seed, same options -> same data.')
+        parser.add_argument('--end', type=date.fromisoformat, default=date(2025, 6, 30),
+                            help='Last day of the generated history (YYYY-MM-DD).')
+        parser.add_argument('--days', type=int, default=3 * 365, help='Length of the generated history in days.')
+        parser.add_argument('--prefix', default='synth', help='Username / email prefix of generated users.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT.')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL.')
+        parser.add_argument('--block-size', type=int, default=200,
+                            help='Users generated (and committed) per transaction.')
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild episode rollups afterwards.')
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        prefix = options['prefix']
+        if user_model.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users prefixed {prefix!r} already exist; pass another --prefix')
+
+        gen = Generator(options['seed'], options['end'], options['days'], options['episodes_per_profile'])
+        self.batch_size = options['batch_size']
+        self.use_copy = _uses_copy() and not options['no_copy']
+        self.counts = {}
+        started = time.perf_counter()
+
+        with historic_timestamps(Profile, Episode, Trigger, Behavior, Intervention, Session, School, Therapist):
+            schools = options['schools'] if options['schools'] is not None else options['users'] // 200 + 1
+            with transaction.atomic():
+                self.seed_schools(gen, schools)
+            # One hash for every generated account (hashing per user would dominate the run),
+            # salted from the seed so reruns stay identical
+            password = make_password(f'{prefix}-password', salt=f'{prefix}seed{options["seed"]}')
+            for first in range(0, options['users'], options['block_size']):
+                last = min(first + options['block_size'], options['users'])
+                with transaction.atomic():
+                    self.seed_block(gen, user_model, prefix, password, first, last)
+                self.report(started)
+
+        self.stderr.write('')
+        for model in (Profile, Episode, Trigger, Behavior, Intervention, Session, School, Therapist):
+            invalidate(model)
+        total = sum(self.counts.values())
+        elapsed = time.perf_counter() - started
+        method = 'COPY' if self.use_copy else 'bulk_create'
+        self.stdout.write(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s, {method})'
+        )
+        for name, count in self.counts.items():
+            self.stdout.write(f'  {name:<14} {count:>10}')
+        if not options['skip_rollups']:
+            self.stdout.write(f'Rebuilt {rebuild_rollups()} episode rollups')
+
+    def insert(self, model, rows):
+        if self.use_copy:
+            for start in range(0, len(rows), self.batch_size):
+                _copy_insert(model, rows[start:start + self.batch_size])
+        else:
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+        name = model._meta.verbose_name_plural
+        self.counts[name] = self.counts.get(name, 0) + len(rows)
+        return rows
+
+    def report(self, started):
+        total = sum(self.counts.values())
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f'\r{total} rows, {total / elapsed if elapsed else 0:.0f} rows/s', ending='')
+
+    def seed_schools(self, gen, count):
+        rng = gen.rng
+        schools = self.insert(School, [
+            School(
+                name=f'School {index}', address=f'{rng.randrange(1, 999)} Learning Way',
+                contact_email=f'school{index}@example.com', program_details='Inclusive programme',
+                student_capacity=rng.randrange(40, 600), teacher_student_ratio=Decimal(rng.choice(['3.0', '4.0', '5.0', '6.5', '8.0'])),
+                created_at=gen.moment(), updated_at=gen.end,
+            )
+            for index in range(count)
+        ])
+        self.insert(Therapist, [
+            Therapist(
+                first_name=f'Therapist{number}-{index}', last_name='Synthetic',
+                specialization=rng.choice(SPECIALIZATIONS), school=school,
+                created_at=gen.moment(), updated_at=gen.end,
+            )
+            for number, school in enumerate(schools) for index in range(rng.randint(3, 10))
+        ])
+
+    def seed_block(self, gen, user_model, prefix, password, first, last):
+        rng = gen.rng
+        users = self.insert(user_model, [
+            user_model(
+                username=f'{prefix}{index:07d}', email=f'{prefix}{index:07d}@example.com', password=password,
+                first_name='Synthetic', last_name=f'User{index}', user_type=gen.weighted(USER_TYPES),
+                date_joined=gen.moment(),
+            )
+            for index in range(first, last)
+        ])
+
+        profiles = self.insert(Profile, [
+            Profile(
+                user=user, first_name=f'Child{number}-{index}', last_name=user.last_name,
+                date_of_birth=date(rng.randint(2008, 2021), rng.randint(1, 12), rng.randint(1, 28)),
+                diagnosis_date=date(rng.randint(2015, 2024), rng.randint(1, 12), rng.randint(1, 28)),
+                severity=gen.weighted(SEVERITIES), communication_level=rng.choice(['verbal', 'minimal', 'non-verbal']),
+                created_at=user.date_joined, updated_at=user.date_joined,
+            )
+            for number, user in enumerate(users, first) if user.user_type != CustomUser.THERAPIST
+            for index in range(1 + min(int(rng.expovariate(1.5)), 4))
+        ])
+
+        episodes, sessions = [], []
+        for profile in profiles:
+            for _ in range(gen.episode_count()):
+                start = gen.moment()
+                end = start + gen.duration()
+                episodes.append(Episode(
+                    profile=profile, title='Episode', description='Synthetic episode', start_time=start, end_time=end,
+                    duration=end - start, episode_date=start.date(), severity=gen.weighted(SEVERITIES),
+                    created_at=end, updated_at=end,
+                ))
+            for _ in range(rng.randint(0, gen.days // 14)):
+                held = gen.moment()
+                sessions.append(Session(
+                    profile=profile, session_date=held.date(), therapist=f'Therapist {rng.randrange(50)}',
+                    notes='Synthetic session', goals='Regulation', created_at=held, updated_at=held,
+                ))
+        self.insert(Episode, episodes)
+        self.insert(Session, sessions)
+
+        triggers, behaviors = [], []
+        for episode in episodes:
+            for _ in range(rng.choices([0, 1, 2, 3], [15, 50, 25, 10])[0]):
+                triggers.append(Trigger(
+                    episode=episode, profile_id=episode.profile_id, trigger_type=rng.choice(TRIGGER_TYPES),
+                    description='Synthetic trigger', severity=gen.weighted(SEVERITIES), management_strategy='Avoid',
+                    timestamp=episode.start_time, created_at=episode.end_time, updated_at=episode.end_time,
+                ))
+            for _ in range(rng.choices([1, 2, 3], [60, 30, 10])[0]):
+                moment = episode.start_time + (episode.end_time - episode.start_time) * rng.random()
+                behaviors.append(Behavior(
+                    episode=episode, profile_id=episode.profile_id, behavior_type=rng.choice(BEHAVIOR_TYPES),
+                    description='Synthetic behavior', frequency=rng.randint(1, 10), context='Synthetic',
+                    timestamp=moment, created_at=episode.end_time, updated_at=episode.end_time,
+                ))
+        self.insert(Trigger, triggers)
+        self.insert(Behavior, behaviors)
+
+        # Interventions answer a behavior of the same episode, a little after it
+        self.insert(Intervention, [
+            Intervention(
+                episode_id=behavior.episode_id, profile_id=behavior.profile_id, behavior=behavior,
+                intervention_type=rng.choice(INTERVENTION_TYPES), description='Synthetic intervention',
+                effectiveness=rng.choice(EFFECTIVENESS), timestamp=behavior.timestamp + timedelta(minutes=rng.randint(1, 15)),
+                created_at=behavior.updated_at, updated_at=behavior.updated_at,
+            )
+            for behavior in behaviors for _ in range(rng.choices([0, 1, 2], [30, 55, 15])[0])
+        ])
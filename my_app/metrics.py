@@ -0,0 +1,215 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import caching
+
+
+# Per-endpoint request metrics, exposed at /metrics in the Prometheus text format.
+#
+# MetricsMiddleware times each request and files it under (view name, method,
+# status class): a latency histogram plus totals for DB queries, DB time, serializer
+# time and response bytes. The per-request sample lives in a ContextVar, so the DB
+# wrapper (installed on every connection) and timed_serialization find it from any
+# thread the request runs on -- including the sync_to_async threads of async views.
+# Serializer time covers the list and detail helpers (views.list_response and
+# detail_response, their async_views twins), which wrap their .data calls; streamed
+# lists are serialized after the request is recorded and are left out, as with bytes.
+#
+# Aggregation is lock-free: every thread writes only its own shard (a dict of plain
+# lists), and a scrape sums copies of all shards. Shards of threads that have exited
+# (e.g. recycled sync_to_async or server worker threads) are folded into one retired
+# total when a scrape runs or a new thread starts recording, so memory is bounded by
+# the live threads. Figures are per process; with several workers each one reports
+# its own, as with caching.stats().
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Request sample: [queries, DB seconds, serializer seconds]
+_sample = ContextVar('metrics_sample', default=None)
+
+_shards = []  # (thread, shard) for every thread that has recorded a request
+_retired = {}  # Totals of the shards of exited threads
+_retire_lock = threading.Lock()
+_local = threading.local()
+
+
+def latency_buckets():
+    return tuple(getattr(settings, 'METRICS_LATENCY_BUCKETS', DEFAULT_LATENCY_BUCKETS))
+
+
+def _merge(totals, shard):
+    for key, series in shard.items():
+        current = totals.get(key)
+        totals[key] = list(series) if current is None else [a + b for a, b in zip(current, series)]
+
+
+def _retire_dead_shards():
+    # A dead thread no longer writes its shard, so it can be folded without racing it;
+    # the lock keeps two concurrent folds from counting a shard twice
+    with _retire_lock:
+        for entry in list(_shards):
+            thread, shard = entry
+            if not thread.is_alive():
+                _shards.remove(entry)
+                _merge(_retired, shard)
+
+
+def _shard():
+    try:
+        return _local.series
+    except AttributeError:
+        _retire_dead_shards()
+        _local.series = {}
+        _shards.append((threading.current_thread(), _local.series))
+        return _local.series
+
+
+def record_query(execute, sql, params, many, context):
+    """connection.execute_wrapper hook: counts and times queries run for a request."""
+    sample = _sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample[0] += 1
+        sample[1] += perf_counter() - started
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_serialization():
+    """Add the time spent in the block to the current request's serializer total."""
+    sample = _sample.get()
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        if sample is not None:
+            sample[2] += perf_counter() - started
+
+
+def install():
+    """Hook the DB execute wrapper into every connection (called from AppConfig.ready)."""
+    connection_created.connect(_wrap_connection, dispatch_uid='metrics_execute_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(None, connection)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.buckets = latency_buckets()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        sample = [0, 0.0, 0.0]
+        token = _sample.set(sample)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _sample.reset(token)
+        self.record(request, response, perf_counter() - started, sample)
+        return response
+
+    async def __acall__(self, request):
+        sample = [0, 0.0, 0.0]
+        token = _sample.set(sample)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _sample.reset(token)
+        self.record(request, response, perf_counter() - started, sample)
+        return response
+
+    def record(self, request, response, elapsed, sample):
+        match = request.resolver_match
+        method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+        key = (match.view_name if match is not None else 'unresolved', method, response.status_code // 100)
+        shard = _shard()
+        series = shard.get(key)
+        if series is None:
+            # Layout: one slot per bucket plus +Inf, then latency sum, queries, DB, serializer and bytes totals
+            series = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0, 0.0, 0.0, 0]
+        series[bisect_left(self.buckets, elapsed)] += 1
+        series[-5] += elapsed
+        series[-4] += sample[0]
+        series[-3] += sample[1]
+        series[-2] += sample[2]
+        if not response.streaming:  # Streamed bodies are produced after the response leaves
+            series[-1] += len(response.content)
+
+
+def snapshot():
+    """Totals per (endpoint, method, status) summed over every thread's shard."""
+    _retire_dead_shards()
+    totals = {}
+    with _retire_lock:
+        _merge(totals, _retired)
+        for _, shard in _shards:
+            _merge(totals, shard.copy())
+    return totals
+
+
+def _labels(key):
+    endpoint, method, status_class = key
+    endpoint = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+    return f'endpoint="{endpoint}",method="{method}",status="{status_class}xx"'
+
+
+def render_metrics():
+    """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+    buckets = latency_buckets()
+    totals = sorted(snapshot().items())
+    lines = [
+        '# HELP serenitytrack_request_duration_seconds Request latency by endpoint.',
+        '# TYPE serenitytrack_request_duration_seconds histogram',
+    ]
+    for key, series in totals:
+        labels, cumulative = _labels(key), 0
+        for bound, count in zip(buckets + ('+Inf',), series):
+            cumulative += count
+            lines.append(f'serenitytrack_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'serenitytrack_request_duration_seconds_sum{{{labels}}} {series[-5]!r}')
+        lines.append(f'serenitytrack_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+    counters = [
+        ('db_queries_total', 'Database queries run by requests.', -4),
+        ('db_duration_seconds_total', 'Time spent executing database queries.', -3),
+        ('serializer_duration_seconds_total', 'Time spent serializing list and detail payloads.', -2),
+        ('response_bytes_total', 'Response body bytes (streamed responses excluded).', -1),
+    ]
+    for name, help_text, index in counters:
+        lines += [f'# HELP serenitytrack_{name} {help_text}', f'# TYPE serenitytrack_{name} counter']
+        lines += [f'serenitytrack_{name}{{{_labels(key)}}} {series[index]!r}' for key, series in totals]
+
+    lines += [
+        '# HELP serenitytrack_serialized_cache_requests_total Serialized payload cache lookups.',
+        '# TYPE serenitytrack_serialized_cache_requests_total counter',
+    ]
+    for outcome, count in sorted(caching.stats().items()):
+        lines.append(f'serenitytrack_serialized_cache_requests_total{{outcome="{outcome}"}} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('my_app', '0003_therapist_address'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='behavior',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'created_at'], name='behavior_live_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='behavior',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['episode'], name='behavior_live_episode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['date_joined', 'id'], name='user_live_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'created_at'], name='episode_live_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['episode_date'], name='episode_live_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'created_at'], name='intervention_live_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['episode'], name='intervention_live_episode_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'created_at'], name='profile_live_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'created_at'], name='session_live_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trigger',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'created_at'], name='trigger_live_profile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trigger',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['episode'], name='trigger_live_episode_idx'),
+        ),
+    ]
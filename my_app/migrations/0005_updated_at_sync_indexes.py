@@ -0,0 +1,37 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0004_soft_delete_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='behavior',
+            index=models.Index(fields=['updated_at', 'id'], name='behavior_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['updated_at', 'id'], name='episode_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['updated_at', 'id'], name='intervention_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['updated_at', 'id'], name='profile_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['updated_at', 'id'], name='session_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trigger',
+            index=models.Index(fields=['updated_at', 'id'], name='trigger_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0007_revoked_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='behavior',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'behavior_type', 'created_at'], name='behavior_profile_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'episode_date'], name='episode_profile_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'start_time'], name='episode_profile_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'severity', 'created_at'], name='episode_profile_sev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'session_date'], name='session_profile_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trigger',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'trigger_type', 'created_at'], name='trigger_profile_type_idx'),
+        ),
+    ]
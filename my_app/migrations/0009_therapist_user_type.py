@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0008_profile_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='user_type',
+            field=models.CharField(choices=[('autistic', 'Autistic'), ('parent', 'Parent'), ('guardian', 'Guardian'), ('therapist', 'Therapist')], default='autistic', max_length=10),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0009_therapist_user_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='behavior',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'timestamp'], name='behavior_profile_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'timestamp'], name='intervention_profile_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trigger',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'timestamp'], name='trigger_profile_time_idx'),
+        ),
+    ]
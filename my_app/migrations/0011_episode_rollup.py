@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0010_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('episode_count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.DurationField()),
+                ('low_count', models.PositiveIntegerField(default=0)),
+                ('medium_count', models.PositiveIntegerField(default=0)),
+                ('high_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='episode_rollups', to='my_app.profile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('profile', 'period', 'period_start'), name='episode_rollup_bucket_uniq')],
+            },
+        ),
+    ]
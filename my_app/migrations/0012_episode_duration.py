@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from django.db.models import DurationField, ExpressionWrapper, F
+
+
+BATCH_SIZE = 10000
+
+
+def backfill_duration(apps, schema_editor):
+    # Batched by primary key range so a large table is not rewritten in one statement
+    Episode = apps.get_model('my_app', 'Episode')
+    duration = ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())
+    last_id = Episode.objects.aggregate(last=models.Max('id'))['last'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        Episode.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE).update(duration=duration)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0011_episode_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='duration',
+            field=models.DurationField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_duration, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='episode',
+            name='duration',
+            field=models.DurationField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['profile', 'duration'], name='episode_profile_dur_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['duration', 'id'], name='episode_live_duration_idx'),
+        ),
+    ]
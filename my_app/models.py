@@ -1,6 +1,29 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+
+# Index condition shared by the partial indexes: only live rows are indexed
+LIVE_ROWS = Q(is_deleted=False)
+
+
+# QuerySet with a bulk soft delete. delete() keeps Django's behaviour (and return
+# value); soft_delete() is one UPDATE that sends no signals, so the caller must do
+# the cache invalidation the post_save receivers would (see bulk.bulk_delete). It
+# is not for episodes, whose rollups are kept by those receivers.
+class SoftDeleteQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """Mark every row deleted in a single UPDATE; returns the number of rows."""
+        return self.update(is_deleted=True, updated_at=timezone.now())
+
+
+# Default manager: hides soft-deleted rows. Use all_objects to include them.
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
 
 
 # SoftDeleteModel for handling soft delete functionality
@@ -9,6 +32,9 @@ class SoftDeleteModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SoftDeleteManager()
+    all_objects = models.Manager.from_queryset(SoftDeleteQuerySet)()
+
     class Meta:
         abstract = True
 
@@ -27,11 +53,13 @@ class CustomUser(AbstractUser):
     AUTISTIC = 'autistic'
     PARENT = 'parent'
     GUARDIAN = 'guardian'
+    THERAPIST = 'therapist'
 
     USER_TYPES = [
         (AUTISTIC, 'Autistic'),
         (PARENT, 'Parent'),
         (GUARDIAN, 'Guardian'),
+        (THERAPIST, 'Therapist'),
     ]
 
     user_type = models.CharField(
@@ -43,6 +71,14 @@ class CustomUser(AbstractUser):
 
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']  # Fields required for superuser creation
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], condition=LIVE_ROWS, name='user_live_joined_idx'),
+            # Case-insensitive login lookups (iexact compiles to UPPER(...) on PostgreSQL)
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -57,6 +93,11 @@ class Profile(SoftDeleteModel):
     severity = models.CharField(max_length=50)
     communication_level = models.CharField(max_length=50)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], condition=LIVE_ROWS, name='profile_live_user_idx'),
+            models.Index(fields=['updated_at', 'id'], name='profile_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} (Profile of {self.user.username})"
@@ -73,13 +114,38 @@ class Episode(SoftDeleteModel):
     severity = models.CharField(max_length=50, choices=[('Low', 'Low'), ('Medium', 'Medium'),
                                                         ('High', 'High')])  # Severity of the episode
     notes = models.TextField(blank=True)  # Additional notes about the episode
+    # end_time - start_time, stored by save() so it can be filtered, sorted and aggregated in SQL
+    duration = models.DurationField(editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], condition=LIVE_ROWS, name='episode_live_profile_idx'),
+            models.Index(fields=['episode_date'], condition=LIVE_ROWS, name='episode_live_date_idx'),
+            # Profile-scoped list filters (my_app.filters)
+            models.Index(fields=['profile', 'episode_date'], condition=LIVE_ROWS, name='episode_profile_date_idx'),
+            models.Index(fields=['profile', 'start_time'], condition=LIVE_ROWS, name='episode_profile_start_idx'),
+            models.Index(fields=['profile', 'severity', 'created_at'], condition=LIVE_ROWS,
+                         name='episode_profile_sev_idx'),
+            models.Index(fields=['updated_at', 'id'], name='episode_updated_idx'),
+            # min_duration filters and ?ordering=-duration ("longest episodes")
+            models.Index(fields=['profile', 'duration'], condition=LIVE_ROWS, name='episode_profile_dur_idx'),
+            models.Index(fields=['duration', 'id'], condition=LIVE_ROWS, name='episode_live_duration_idx'),
+        ]
 
     def __str__(self):
         return f"Episode {self.id} for {self.profile.first_name} {self.profile.last_name}"
 
-    @property
-    def duration(self):
-        return self.end_time - self.start_time  # Calculate the duration of the episode
+    def update_duration(self):
+        start_time = self._meta.get_field('start_time').to_python(self.start_time)
+        end_time = self._meta.get_field('end_time').to_python(self.end_time)
+        self.duration = end_time - start_time  # Calculate the duration of the episode
+
+    def save(self, *args, **kwargs):
+        self.update_duration()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'duration'}
+        super().save(*args, **kwargs)
 
 
 # Trigger model
@@ -92,6 +158,16 @@ class Trigger(SoftDeleteModel):
     management_strategy = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)  # The time when the trigger occurred during the episoFde
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], condition=LIVE_ROWS, name='trigger_live_profile_idx'),
+            models.Index(fields=['episode'], condition=LIVE_ROWS, name='trigger_live_episode_idx'),
+            models.Index(fields=['profile', 'timestamp'], condition=LIVE_ROWS, name='trigger_profile_time_idx'),
+            models.Index(fields=['profile', 'trigger_type', 'created_at'], condition=LIVE_ROWS,
+                         name='trigger_profile_type_idx'),
+            models.Index(fields=['updated_at', 'id'], name='trigger_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Trigger {self.trigger_type} for Episode {self.episode.id}"
 
@@ -106,6 +182,16 @@ class Behavior(SoftDeleteModel):
     context = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)  # The time when the behavior occurred during the episode
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], condition=LIVE_ROWS, name='behavior_live_profile_idx'),
+            models.Index(fields=['episode'], condition=LIVE_ROWS, name='behavior_live_episode_idx'),
+            models.Index(fields=['profile', 'timestamp'], condition=LIVE_ROWS, name='behavior_profile_time_idx'),
+            models.Index(fields=['profile', 'behavior_type', 'created_at'], condition=LIVE_ROWS,
+                         name='behavior_profile_type_idx'),
+            models.Index(fields=['updated_at', 'id'], name='behavior_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Behavior {self.behavior_type} for Episode {self.episode.id}"
 
@@ -120,6 +206,14 @@ class Intervention(SoftDeleteModel):
     effectiveness = models.CharField(max_length=100)
     timestamp = models.DateTimeField(auto_now_add=True)  # The time when the intervention was applied during the episode
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], condition=LIVE_ROWS, name='intervention_live_profile_idx'),
+            models.Index(fields=['episode'], condition=LIVE_ROWS, name='intervention_live_episode_idx'),
+            models.Index(fields=['profile', 'timestamp'], condition=LIVE_ROWS, name='intervention_profile_time_idx'),
+            models.Index(fields=['updated_at', 'id'], name='intervention_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Intervention {self.intervention_type} for Episode {self.episode.id}"
 
@@ -138,6 +232,11 @@ class Session(SoftDeleteModel):
     class Meta:
         ordering = ['-created_at']
         db_table = 'session'
+        indexes = [
+            models.Index(fields=['profile', 'created_at'], condition=LIVE_ROWS, name='session_live_profile_idx'),
+            models.Index(fields=['profile', 'session_date'], condition=LIVE_ROWS, name='session_profile_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='session_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Session for {self.profile.first_name} {self.profile.last_name} on {self.session_date}"
@@ -171,3 +270,49 @@ class Therapist(SoftDeleteModel):
         return f"{self.first_name} {self.last_name}"
 
 
+
+
+# Precomputed episode statistics per profile and day / week / month bucket,
+# maintained by my_app.analytics (signals) and rebuilt by rebuild_episode_rollups
+class EpisodeRollup(models.Model):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+    PERIODS = [
+        (DAY, 'Day'),
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    ]
+
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='episode_rollups')
+    period = models.CharField(max_length=5, choices=PERIODS)
+    period_start = models.DateField()  # First day of the bucket (weeks start on Monday)
+    episode_count = models.PositiveIntegerField(default=0)
+    total_duration = models.DurationField()
+    low_count = models.PositiveIntegerField(default=0)
+    medium_count = models.PositiveIntegerField(default=0)
+    high_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'period', 'period_start'], name='episode_rollup_bucket_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} rollup from {self.period_start} for profile {self.profile_id}"
+
+    @property
+    def average_duration(self):
+        return self.total_duration / self.episode_count if self.episode_count else None
+
+
+# Revoked JWTs (logout). Rows are only needed until the token would have expired anyway.
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Revoked token {self.jti}"
@@ -1,71 +1,52 @@
 from django.contrib.auth import get_user_model, authenticate
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import Profile, Trigger, Behavior, Intervention, Session, Episode, School, Therapist
+from .models import Profile, Trigger, Behavior, Intervention, Session, Episode, EpisodeRollup, School, Therapist
+from .query_planner import plan_queryset
+from .caching import invalidate_instances
+from .revocation import revocation_store
+from .scoping import scope_queryset
 
 
-class UserSerializer(serializers.ModelSerializer):
-    profiles = serializers.SerializerMethodField()  # Fetch related profiles
-
-    class Meta:
-        model = get_user_model()
-        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'password', 'user_type', 'profiles']
-        extra_kwargs = {'password': {'write_only': True}}
-
-    def create(self, validated_data):
-        user = get_user_model().objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            password=validated_data['password'],
-            user_type=validated_data['user_type']  # User type field
-        )
-        return user
-
-    def get_profiles(self, obj):
-        profiles = obj.profiles.all()  # Assumes related_name='profiles' in the Profile model
-        return ProfileSerializer(profiles, many=True).data
-
-
-class CustomTokenObtainPairSerializer(serializers.Serializer):
-    username = serializers.CharField()
-    password = serializers.CharField()
-
-    def validate(self, attrs):
-        user = authenticate(username=attrs['username'], password=attrs['password'])
-        if user is None:
-            raise serializers.ValidationError('Invalid credentials')
+class ScopedRelationsMixin:
+    """Limits writable relations to the rows the requesting user can see.
 
-        refresh = RefreshToken.for_user(user)
+    Without it a caller could attach records to someone else's profile or episode
+    by id. Only writes resolve ids, so read-only renders and serializers built
+    without a request in their context are left unscoped.
+    """
 
-        return {
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
-            'user': UserSerializer(user).data
-        }
-
-
-class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and hasattr(self.root, 'initial_data'):
+            for field in fields.values():
+                if isinstance(field, serializers.PrimaryKeyRelatedField) and not field.read_only:
+                    field.queryset = scope_queryset(field.queryset, request.user)
+        return fields
 
 
-class TriggerSerializer(serializers.ModelSerializer):
+class TriggerSerializer(ScopedRelationsMixin, serializers.ModelSerializer):
     class Meta:
         model = Trigger
         fields = ['id', 'profile','episode', 'trigger_type', 'description', 'severity', 'management_strategy', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at', 'id']
 
 
-class BehaviorSerializer(serializers.ModelSerializer):
+class BehaviorSerializer(ScopedRelationsMixin, serializers.ModelSerializer):
     class Meta:
         model = Behavior
         fields = ['id', 'profile', 'behavior_type', 'description','episode', 'frequency', 'context', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at', 'id']
 
 
-class InterventionSerializer(serializers.ModelSerializer):
+class InterventionSerializer(ScopedRelationsMixin, serializers.ModelSerializer):
     class Meta:
         model = Intervention
         fields = ['id', 'behavior','profile', 'episode','intervention_type', 'description', 'effectiveness', 'created_at', 'updated_at']
@@ -74,18 +55,109 @@ class InterventionSerializer(serializers.ModelSerializer):
 
 
 
-class EpisodeSerializer(serializers.ModelSerializer):
+class EpisodeSerializer(ScopedRelationsMixin, serializers.ModelSerializer):
+    duration = serializers.ReadOnlyField()  # Stored column; rendered in seconds as before
+
     class Meta:
         model = Episode
-        fields = ['id', 'profile', 'title', 'description','start_time', 'end_time', 'episode_date', 'duration', 'is_deleted', 'created_at', 'updated_at']
+        fields = ['id', 'profile', 'title', 'description','start_time', 'end_time', 'episode_date', 'severity', 'duration', 'is_deleted', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at', 'id']
 
-class SessionSerializer(serializers.ModelSerializer):
+
+# Composite episode ingest: one payload carrying the episode and its children.
+# Interventions point at behaviors through client-local refs instead of ids.
+class EpisodeTriggerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Trigger
+        fields = ['id', 'trigger_type', 'description', 'severity', 'management_strategy']
+        read_only_fields = ['id']
+
+
+class EpisodeBehaviorSerializer(serializers.ModelSerializer):
+    ref = serializers.CharField(max_length=64)
+
+    class Meta:
+        model = Behavior
+        fields = ['id', 'ref', 'behavior_type', 'description', 'frequency', 'context']
+        read_only_fields = ['id']
+
+
+class EpisodeInterventionSerializer(serializers.ModelSerializer):
+    behavior_ref = serializers.CharField(max_length=64)
+
+    class Meta:
+        model = Intervention
+        fields = ['id', 'behavior', 'behavior_ref', 'intervention_type', 'description', 'effectiveness']
+        read_only_fields = ['id', 'behavior']
+
+
+class EpisodeIngestSerializer(EpisodeSerializer):
+    # Children are read back from the lists built in create(), not from the relations
+    triggers = EpisodeTriggerSerializer(many=True, required=False, source='new_triggers')
+    behaviors = EpisodeBehaviorSerializer(many=True, required=False, source='new_behaviors')
+    interventions = EpisodeInterventionSerializer(many=True, required=False, source='new_interventions')
+
+    class Meta(EpisodeSerializer.Meta):
+        fields = EpisodeSerializer.Meta.fields + ['triggers', 'behaviors', 'interventions']
+
+    def validate(self, attrs):
+        refs = [behavior['ref'] for behavior in attrs.get('new_behaviors', [])]
+        if len(refs) != len(set(refs)):
+            raise serializers.ValidationError({'behaviors': 'Behavior refs must be unique.'})
+        unknown = {
+            intervention['behavior_ref'] for intervention in attrs.get('new_interventions', [])
+        } - set(refs)
+        if unknown:
+            raise serializers.ValidationError(
+                {'interventions': f"Unknown behavior_ref: {', '.join(sorted(unknown))}"}
+            )
+        return attrs
+
+    def create(self, validated_data):
+        triggers = validated_data.pop('new_triggers', [])
+        behaviors = validated_data.pop('new_behaviors', [])
+        interventions = validated_data.pop('new_interventions', [])
+
+        with transaction.atomic():
+            episode = Episode.objects.create(**validated_data)
+            children = {'episode': episode, 'profile': episode.profile}
+
+            episode.new_triggers = Trigger.objects.bulk_create(
+                [Trigger(**children, **trigger) for trigger in triggers]
+            )
+
+            episode.new_behaviors = []
+            for data in behaviors:
+                behavior = Behavior(**children, **{k: v for k, v in data.items() if k != 'ref'})
+                behavior.ref = data['ref']
+                episode.new_behaviors.append(behavior)
+            Behavior.objects.bulk_create(episode.new_behaviors)
+            behaviors_by_ref = {behavior.ref: behavior for behavior in episode.new_behaviors}
+
+            episode.new_interventions = []
+            for data in interventions:
+                intervention = Intervention(
+                    **children,
+                    behavior=behaviors_by_ref[data['behavior_ref']],
+                    **{k: v for k, v in data.items() if k != 'behavior_ref'},
+                )
+                intervention.behavior_ref = data['behavior_ref']
+                episode.new_interventions.append(intervention)
+            Intervention.objects.bulk_create(episode.new_interventions)
+
+            # bulk_create sends no post_save, so invalidate the cached children by hand
+            for created in (episode.new_triggers, episode.new_behaviors, episode.new_interventions):
+                invalidate_instances(created)
+
+        return episode
+
+
+class SessionSerializer(ScopedRelationsMixin, serializers.ModelSerializer):
     class Meta:
         model = Session
         fields = ['id', 'profile', 'session_date', 'therapist', 'notes', 'goals', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at', 'id']
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(ScopedRelationsMixin, serializers.ModelSerializer):
     triggers = TriggerSerializer(many=True, read_only=True)
     behaviors = BehaviorSerializer(many=True, read_only=True)
     sessions = SessionSerializer(many=True, read_only=True)
@@ -98,6 +170,126 @@ class ProfileSerializer(serializers.ModelSerializer):
                   'communication_level', 'created_at', 'updated_at', 'triggers', 'behaviors', 'sessions','episodes','interventions']
         read_only_fields = ['created_at', 'updated_at']
 
+
+# Precomputed episode statistics (analytics endpoint). Durations render like
+# Episode.duration; severity counts are grouped under one key.
+class EpisodeRollupSerializer(serializers.ModelSerializer):
+    total_duration = serializers.ReadOnlyField()
+    average_duration = serializers.ReadOnlyField()
+    severity = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EpisodeRollup
+        fields = ['period', 'period_start', 'episode_count', 'total_duration', 'average_duration', 'severity']
+
+    def get_severity(self, rollup):
+        return {'Low': rollup.low_count, 'Medium': rollup.medium_count, 'High': rollup.high_count}
+
+
+# Profile columns only, without the nested child lists (used by delta sync)
+class ProfileSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Profile
+        fields = ['id', 'user', 'first_name', 'last_name', 'date_of_birth', 'diagnosis_date', 'severity',
+                  'communication_level', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+
+class UserSerializer(serializers.ModelSerializer):
+    profiles = ProfileSerializer(many=True, read_only=True)  # Fetch related profiles
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'password', 'user_type', 'profiles']
+        extra_kwargs = {'password': {'write_only': True}}
+
+    def validate_user_type(self, value):
+        # Therapists read every profile (see scoping), so only staff may grant the type
+        request = self.context.get('request')
+        unchanged = self.instance is not None and self.instance.user_type == value
+        if value == get_user_model().THERAPIST and not unchanged and not (request and request.user.is_staff):
+            raise serializers.ValidationError('Only staff can assign the therapist user type.')
+        return value
+
+    def create(self, validated_data):
+        user = get_user_model().objects.create_user(
+            username=validated_data['username'],
+            email=validated_data['email'],
+            first_name=validated_data['first_name'],
+            last_name=validated_data['last_name'],
+            password=validated_data['password'],
+            user_type=validated_data['user_type']  # User type field
+        )
+        return user
+
+
+# Compact login payload: the user plus profile ids/names. The full graph is served
+# separately by the user detail endpoints, so login cost does not grow with history.
+class ProfileSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Profile
+        fields = ['id', 'first_name', 'last_name']
+
+
+class LoginUserSerializer(serializers.ModelSerializer):
+    profiles = ProfileSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'user_type', 'profiles']
+
+
+def login_payload(user):
+    """Tokens plus the compact user summary, shared by the sync and async login views."""
+    refresh = RefreshToken.for_user(user)
+    # One query for the live profile summaries, whatever the size of their histories
+    prefetch_related_objects([user], *plan_queryset(LoginUserSerializer)[1])
+
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'user': LoginUserSerializer(user).data
+    }
+
+
+class CustomTokenObtainPairSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField()
+
+    def validate(self, attrs):
+        user = authenticate(username=attrs['username'], password=attrs['password'])
+        if user is None:
+            raise serializers.ValidationError('Invalid credentials')
+
+        return login_payload(user)
+
+
+class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = CustomTokenObtainPairSerializer
+
+
+# Refresh that refuses tokens revoked through logout
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        try:
+            refresh = self.token_class(attrs['refresh'])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        if revocation_store.is_revoked(refresh.get(jwt_settings.JTI_CLAIM)):
+            raise InvalidToken('Token has been revoked')
+        return super().validate(attrs)
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(exc.args[0])
+
+
 class SchoolSerializer(serializers.ModelSerializer):
     class Meta:
         model = School
@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.duration import duration_iso_string
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# Keyset (cursor) pagination over (created_at, id), newest first.
+# Each page is a "WHERE (created_at, id) < cursor ORDER BY created_at DESC, id DESC LIMIT n"
+# query, so deep pages cost the same as the first one (no OFFSET). Other datetime or
+# duration columns (e.g. Episode.duration) can be used as the ordering field.
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering_field='created_at'):
+        self.ordering_field = ordering_field
+        self.page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+        self.next_cursor = None
+        self.request = None
+        self.current_page_size = None
+
+    @staticmethod
+    def _params(request):
+        # DRF Request or, for the async views, a plain Django HttpRequest
+        return getattr(request, 'query_params', request.GET)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                self._params(request)[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return min(self.page_size, self.max_page_size)
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.ordering_field)
+        value = duration_iso_string(value) if isinstance(value, timedelta) else value.isoformat()
+        position = [value, instance.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = self._params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = model._meta.get_field(self.ordering_field).to_python(value)
+            if value is None:
+                raise ValueError(value)
+            return value, int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated query for the requested page (plus one look-ahead row)."""
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-pk')
+
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'{self.ordering_field}__lt': value})
+                | Q(**{self.ordering_field: value, 'pk__lt': pk})
+            )
+
+        # Fetch one extra row to find out whether there is a next page
+        return queryset[:self.current_page_size + 1]
+
+    def finish_page(self, rows):
+        page = list(rows)
+        if len(page) > self.current_page_size:
+            page = page[:self.current_page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(self.page_queryset(queryset, request))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.finish_page([row async for row in self.page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'cursor': self.next_cursor,
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -0,0 +1,58 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+# Password hashing for the async login path. PBKDF2/bcrypt/argon2 dominate login CPU
+# time; running them on the event loop (or on asgiref's single sync thread) would
+# serialize every login in the worker. The pool runs them on a bounded set of
+# threads instead -- hashlib and the C hashers release the GIL, so the threads use
+# separate cores -- and refuses new work once too many checks are queued.
+
+
+class PoolSaturated(Exception):
+    """Raised when LOGIN_HASH_MAX_PENDING password checks are already in flight."""
+
+
+class PasswordHashPool:
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        # Only touched from the event loop thread, so a plain counter is enough
+        self.pending = 0
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise PoolSaturated()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def check_password(self, user, raw_password):
+        """Verify ``raw_password`` for ``user``, rehashing it if the hasher settings changed."""
+        needs_rehash = []
+        # No DB access happens in the pool: the setter only records that an upgrade is due
+        is_correct = await self.run(check_password, raw_password, user.password, needs_rehash.append)
+        if is_correct and needs_rehash:
+            user.password = await self.run(make_password, raw_password)
+            await user.asave(update_fields=['password'])
+        return is_correct
+
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = PasswordHashPool(
+            workers=getattr(settings, 'LOGIN_HASH_WORKERS', None),
+            max_pending=getattr(settings, 'LOGIN_HASH_MAX_PENDING', None),
+        )
+    return _pool
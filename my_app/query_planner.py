@@ -0,0 +1,85 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+# Query planner: walks a serializer tree and derives the select_related /
+# prefetch_related lookups needed to serialize it in a constant number of queries.
+
+
+def live_queryset(model):
+    """Base queryset for a model, excluding soft-deleted rows when the model supports it."""
+    queryset = model._default_manager.all()
+    if any(field.name == 'is_deleted' for field in model._meta.concrete_fields):
+        queryset = queryset.filter(is_deleted=False)
+    return queryset
+
+
+def _nested_serializers(serializer_class):
+    # Yield (source, child serializer class, many) for every nested model serializer field
+    for field in serializer_class().fields.values():
+        many = isinstance(field, serializers.ListSerializer)
+        child = field.child if many else field
+        if not isinstance(child, serializers.ModelSerializer) or field.source == '*':
+            continue
+        yield field.source, type(child), many
+
+
+def plan_queryset(serializer_class):
+    """Return (select_related, prefetch_related) lookups for ``serializer_class``."""
+    model = serializer_class.Meta.model
+    select_related = []
+    prefetch_related = []
+
+    for source, child_class, many in _nested_serializers(serializer_class):
+        try:
+            relation = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            # Not a model relation (e.g. a property), nothing to plan
+            continue
+        if not relation.is_relation:
+            continue
+
+        if relation.many_to_one or (relation.one_to_one and not many):
+            # Forward single-valued relation: join it and plan its own nested fields
+            select_related.append(source)
+            child_select, child_prefetch = plan_queryset(child_class)
+            select_related.extend(f'{source}__{lookup}' for lookup in child_select)
+            for lookup in child_prefetch:
+                prefetch_related.append(Prefetch(
+                    f'{source}__{lookup.prefetch_through}',
+                    queryset=lookup.queryset,
+                    to_attr=lookup.to_attr,
+                ))
+        else:
+            # Reverse FK / many-to-many: one query per relation, filtered to live rows
+            queryset = optimize_queryset(live_queryset(relation.related_model), child_class)
+            prefetch_related.append(Prefetch(source, queryset=queryset))
+
+    return select_related, prefetch_related
+
+
+def optimize_queryset(queryset, serializer_class):
+    """Apply the planned select_related / prefetch_related lookups to ``queryset``."""
+    select_related, prefetch_related = plan_queryset(serializer_class)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
+def nested_relations(serializer_class):
+    """Yield (related model, lookup back to the root model) for each nested reverse FK."""
+    model = serializer_class.Meta.model
+    for source, child_class, many in _nested_serializers(serializer_class):
+        try:
+            relation = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if not relation.one_to_many:
+            continue
+        back = relation.field.name
+        yield relation.related_model, back
+        for related_model, lookup in nested_relations(child_class):
+            yield related_model, f'{lookup}__{back}'
@@ -0,0 +1,112 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import RevokedToken
+
+
+# Token revocation store. Every process keeps a Bloom filter of the revoked JTIs
+# that have not expired yet, so checking a token is a few bit lookups: a negative is
+# definitive, and only the rare positive (real revocation or false positive) is
+# confirmed against the RevokedToken table. The filter picks up other processes'
+# revocations every REVOCATION_REFRESH_SECONDS with one indexed "id > last seen"
+# query, and is rebuilt from the live rows every REVOCATION_REBUILD_SECONDS so
+# expired JTIs drop out. prune_revoked_tokens deletes expired rows from the table.
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing (Kirsch-Mitzenmacher) over one 128-bit digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._next_refresh = 0.0
+        self._next_rebuild = 0.0
+
+    def _rebuild(self):
+        rows = list(
+            RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('id', 'jti')
+        )
+        capacity = max(len(rows) * 2, getattr(settings, 'REVOCATION_FILTER_CAPACITY', 10000))
+        bloom = BloomFilter(capacity)
+        for _, jti in rows:
+            bloom.add(jti)
+        self._filter = bloom
+        self._last_id = max((pk for pk, _ in rows), default=self._last_id)
+        self._next_rebuild = time.monotonic() + getattr(settings, 'REVOCATION_REBUILD_SECONDS', 3600)
+
+    def _refresh(self):
+        rows = RevokedToken.objects.filter(id__gt=self._last_id).values_list('id', 'jti')
+        for pk, jti in rows:
+            self._filter.add(jti)
+            self._last_id = max(self._last_id, pk)
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._filter is not None and now < self._next_refresh:
+            return
+        # Only one thread reloads; the others keep reading the current filter
+        if not self._lock.acquire(blocking=self._filter is None):
+            return
+        try:
+            if self._filter is None or now >= self._next_rebuild or self._filter.count >= self._filter.capacity:
+                self._rebuild()
+            else:
+                self._refresh()
+            self._next_refresh = now + getattr(settings, 'REVOCATION_REFRESH_SECONDS', 5)
+        finally:
+            self._lock.release()
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        self._sync()
+        if jti not in self._filter:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, token):
+        """Revoke a validated simplejwt token until its own expiry."""
+        jti = token[jwt_settings.JTI_CLAIM]
+        expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+        self._sync()
+        self._filter.add(jti)
+
+    def prune(self):
+        """Delete expired rows and rebuild the filter; returns the number of rows deleted."""
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        with self._lock:
+            self._rebuild()
+        return deleted
+
+
+revocation_store = RevocationStore()
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import Profile, CustomUser
+
+
+# Row-level scoping: every owned resource is limited to the caller's profiles.
+#
+# The caller's profile ids are cached per user (invalidated by the Profile signals),
+# so scoping a query costs a single "profile_id IN (...)" on the indexed FK rather
+# than a join against profile and user. The invalidation only reaches other worker
+# processes through a shared cache (Redis, Memcached, database): with a per-process
+# backend such as the default locmem cache the ids are read from the database on
+# every request instead, since a stale set would authorize or deny the wrong rows.
+#
+# Staff, superusers and therapists see all profiles (only staff can make a user a
+# therapist, see UserSerializer); anonymous callers see none. Reference data (schools, therapists) is shared.
+
+UserModel = get_user_model()
+
+FULL_SCOPE_USER_TYPES = {CustomUser.THERAPIST}
+
+
+def _profile_ids_key(user_id):
+    return f'scope:profiles:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'SCOPE_CACHE_TIMEOUT', 300)
+
+
+def _load_profile_ids(user_id):
+    return list(Profile.objects.filter(user_id=user_id).values_list('id', flat=True))
+
+
+def _cache_is_shared():
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def owned_profile_ids(user_id):
+    """Ids of the live profiles belonging to ``user_id``, read through a shared cache."""
+    if not _cache_is_shared():
+        return _load_profile_ids(user_id)
+    key = _profile_ids_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = _load_profile_ids(user_id)
+        cache.set(key, ids, _timeout())
+    return ids
+
+
+def forget_profile_ids(*user_ids):
+    cache.delete_many([_profile_ids_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def has_full_scope(user):
+    if not user.is_authenticated:
+        return False
+    return user.is_staff or user.is_superuser or getattr(user, 'user_type', None) in FULL_SCOPE_USER_TYPES
+
+
+def visible_profile_ids(user):
+    """Profile ids ``user`` may read, or None when the scope is unrestricted."""
+    if has_full_scope(user):
+        return None
+    if not user.is_authenticated:
+        return []
+    return owned_profile_ids(user.pk)
+
+
+def syncable_profile_ids(user):
+    """Profile ids whose changes ``user`` receives through sync, or None when unrestricted.
+
+    Unlike visible_profile_ids this includes soft-deleted profiles, so their
+    tombstones still reach the owner; it is a subquery, not the cached id set.
+    """
+    if has_full_scope(user):
+        return None
+    if not user.is_authenticated:
+        return []
+    return Profile.all_objects.filter(user_id=user.pk).values('id')
+
+
+def scope_queryset(queryset, user):
+    """Restrict ``queryset`` to the rows ``user`` may see."""
+    model = queryset.model
+    if model is UserModel:
+        if has_full_scope(user):
+            return queryset
+        return queryset.filter(pk=user.pk) if user.is_authenticated else queryset.none()
+
+    if model is Profile:
+        lookup = 'pk__in'
+    elif any(field.name == 'profile' for field in model._meta.concrete_fields):
+        lookup = 'profile_id__in'
+    else:
+        return queryset
+
+    profile_ids = visible_profile_ids(user)
+    if profile_ids is None:
+        return queryset
+    if not profile_ids:
+        return queryset.none()
+    return queryset.filter(**{lookup: profile_ids})
@@ -0,0 +1,81 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .analytics import episode_share, move_episode_share
+from .authentication import forget_unknown_identifiers, user_state_cache
+from .caching import invalidate_instances
+from .models import CustomUser, Episode, Profile, SoftDeleteModel
+from .scoping import forget_profile_ids
+
+
+# Serialized-payload cache invalidation. SoftDeleteModel.delete() goes through
+# save(), so soft deletes are covered here too; bulk writes invalidate explicitly.
+# Updates remember the stored profile_id first, so a row moved to another profile
+# also invalidates the one it left (episodes get it from remember_episode_share).
+@receiver(pre_save)
+def remember_previous_profile(sender, instance, raw=False, **kwargs):
+    if raw or sender is Episode or not isinstance(instance, SoftDeleteModel) or not hasattr(instance, 'profile_id'):
+        return
+    instance._previous_profile_id = None
+    if instance.pk is not None:
+        instance._previous_profile_id = (
+            sender.all_objects.filter(pk=instance.pk).values_list('profile_id', flat=True).first()
+        )
+
+
+@receiver(post_save)
+def invalidate_serialized_cache(sender, instance, raw=False, **kwargs):
+    if raw or not isinstance(instance, SoftDeleteModel):
+        return
+    invalidate_instances([instance])
+
+
+# A new or renamed user must not stay hidden behind the login negative cache, and
+# update_user / delete_user must not be masked by the JWT user state cache
+@receiver(post_save, sender=CustomUser)
+def forget_user_identifiers(sender, instance, **kwargs):
+    forget_unknown_identifiers(instance.email, instance.username)
+    user_state_cache.invalidate(instance.pk)
+
+
+# Created or deleted profiles change their owner's visible profile ids
+# (update_profile also forgets the previous owner when a profile is reassigned)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_owner_profile_ids(sender, instance, **kwargs):
+    forget_profile_ids(instance.user_id)
+
+
+# Episode rollups: move the episode's share from the buckets it leaves to the ones
+# it enters. Soft deletes are saves, and the rollups only count live episodes, so
+# they are covered too; saves that change none of the rolled-up columns cost nothing.
+def _current_share(episode):
+    return episode_share(episode.profile_id, episode.episode_date, episode.duration, episode.severity,
+                         episode.is_deleted)
+
+
+@receiver(pre_save, sender=Episode)
+def remember_episode_share(sender, instance, raw=False, **kwargs):
+    instance._previous_share = instance._previous_profile_id = None
+    if raw or instance.pk is None:
+        return
+    row = (
+        Episode.all_objects.filter(pk=instance.pk)
+        .values_list('profile_id', 'episode_date', 'duration', 'severity', 'is_deleted')
+        .first()
+    )
+    if row is not None:
+        instance._previous_profile_id = row[0]
+        instance._previous_share = episode_share(*row)
+
+
+@receiver(post_save, sender=Episode)
+def update_episode_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    move_episode_share(getattr(instance, '_previous_share', None), _current_share(instance))
+
+
+@receiver(post_delete, sender=Episode)
+def remove_episode_rollups(sender, instance, **kwargs):
+    move_episode_share(_current_share(instance), None)
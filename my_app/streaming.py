@@ -0,0 +1,68 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# Streaming JSON: rows are read with a server-side cursor and serialized one at a
+# time, so memory stays flat and the first bytes go out before the query finishes.
+# Under ASGI Django collects a sync iterator into a list before sending any of it,
+# so there the chunks are handed over through an async iterator instead (see
+# streaming_content).
+
+
+def wants_stream(request):
+    """True when the client asked for a streamed response with ?stream=1."""
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def iter_json_array(queryset, serializer_class, chunk_size=None):
+    """Yield a JSON array of the serialized queryset, one row per chunk."""
+    chunk_size = chunk_size or getattr(settings, 'API_STREAM_CHUNK_SIZE', 500)
+    # One serializer instance reused for every row, like ListSerializer does for its child
+    serializer = serializer_class()
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    yield '['
+    separator = ''
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield separator + encoder.encode(serializer.to_representation(instance))
+        separator = ','
+    yield ']'
+
+
+def streaming_content(request, chunks, batch_size=1):
+    """``chunks`` as the body of a StreamingHttpResponse answering ``request``.
+
+    Under WSGI that is the iterator itself. Under ASGI it is wrapped in an async
+    iterator that pulls ``batch_size`` chunks per trip to the sync thread, where the
+    database cursor lives.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        return _aiter_chunks(iter(chunks), batch_size)
+    return chunks
+
+
+async def _aiter_chunks(chunks, batch_size):
+    next_batch = sync_to_async(lambda: list(islice(chunks, batch_size)))
+    try:
+        while batch := await next_batch():
+            for chunk in batch:
+                yield chunk
+    finally:
+        # Release the cursor on the sync thread when the client goes away early
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
+
+
+def stream_json_list(request, queryset, serializer_class, chunk_size=None):
+    chunk_size = chunk_size or getattr(settings, 'API_STREAM_CHUNK_SIZE', 500)
+    response = StreamingHttpResponse(
+        streaming_content(request, iter_json_array(queryset, serializer_class, chunk_size), chunk_size),
+        content_type='application/json',
+    )
+    response['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks straight through
+    return response
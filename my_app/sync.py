@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Profile, Episode, Trigger, Behavior, Intervention, Session
+from .my_serializers import (
+    ProfileSyncSerializer, EpisodeSerializer, TriggerSerializer, BehaviorSerializer,
+    InterventionSerializer, SessionSerializer,
+)
+
+
+# Delta sync for offline clients. The change token holds, per resource, the
+# (updated_at, id) of the last row the client received; each call returns the rows
+# changed after that position, with soft-deleted rows sent as tombstones (ids only).
+#
+# Rows are only handed out once they are SYNC_SETTLE_SECONDS old, so a transaction
+# still in flight when a client syncs cannot commit "behind" the client's position.
+SYNC_RESOURCES = [
+    ('profiles', Profile, ProfileSyncSerializer, 'id'),
+    ('episodes', Episode, EpisodeSerializer, 'profile_id'),
+    ('triggers', Trigger, TriggerSerializer, 'profile_id'),
+    ('behaviors', Behavior, BehaviorSerializer, 'profile_id'),
+    ('interventions', Intervention, InterventionSerializer, 'profile_id'),
+    ('sessions', Session, SessionSerializer, 'profile_id'),
+]
+
+
+def encode_token(positions):
+    return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+
+def decode_token(token):
+    if not token:
+        return {}
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return {
+            name: (datetime.fromisoformat(updated_at), int(pk))
+            for name, (updated_at, pk) in positions.items()
+        }
+    except (TypeError, ValueError, AttributeError):
+        raise serializers.ValidationError({'since': 'Invalid sync token'})
+
+
+def _changed_rows(model, position, until, profile_field, profile_id, profile_ids, limit):
+    if position is None:
+        # First sync: the client has nothing to delete, so skip tombstones entirely
+        queryset = model.objects.all()
+    else:
+        updated_at, pk = position
+        queryset = model.all_objects.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk)
+        )
+    queryset = queryset.filter(updated_at__lte=until)
+    if profile_id is not None:
+        queryset = queryset.filter(**{profile_field: profile_id})
+    if profile_ids is not None:
+        queryset = queryset.filter(**{f'{profile_field}__in': profile_ids})
+    return list(queryset.order_by('updated_at', 'pk')[:limit + 1])
+
+
+def collect_changes(token, profile_id=None, profile_ids=None):
+    """Return (changes, next_token, has_more) for everything changed after ``token``.
+
+    ``profile_ids`` limits the changes to those profiles (None means no limit).
+    """
+    positions = decode_token(token)
+    limit = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+    until = timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 2))
+
+    changes = {}
+    next_positions = {
+        name: [updated_at.isoformat(), pk] for name, (updated_at, pk) in positions.items()
+    }
+    has_more = False
+    for name, model, serializer_class, profile_field in SYNC_RESOURCES:
+        rows = _changed_rows(model, positions.get(name), until, profile_field, profile_id, profile_ids, limit)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+        if rows:
+            next_positions[name] = [rows[-1].updated_at.isoformat(), rows[-1].pk]
+
+        serializer = serializer_class()
+        changes[name] = {
+            'updated': [serializer.to_representation(row) for row in rows if not row.is_deleted],
+            'deleted': [row.pk for row in rows if row.is_deleted],
+        }
+    return changes, encode_token(next_positions), has_more
@@ -1,3 +1,906 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import metrics
+from .analytics import rebuild_rollups
+from .authentication import user_state_cache
+from .importer import Checkpoint, Importer
+from .models import CustomUser, Profile, Episode, EpisodeRollup, Trigger, Behavior, Intervention, Session, RevokedToken
+from .revocation import revocation_store
+from .scoping import _profile_ids_key, owned_profile_ids
+
+User = get_user_model()
+
+
+def make_user(username, user_type=CustomUser.PARENT, **extra):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password='pw-12345!',
+        first_name=username.title(), last_name='Test', user_type=user_type, **extra,
+    )
+
+
+def make_profile(user, **extra):
+    return Profile.objects.create(
+        user=user, first_name='Child', last_name=user.last_name, date_of_birth='2015-01-01',
+        diagnosis_date='2018-01-01', severity='Medium', communication_level='verbal', **extra,
+    )
+
+
+def make_episode(profile, **extra):
+    fields = {
+        'title': 'Episode', 'description': 'Test episode', 'start_time': '2025-01-01T10:00:00Z',
+        'end_time': '2025-01-01T10:30:00Z', 'episode_date': '2025-01-01', 'severity': 'Low', **extra,
+    }
+    return Episode.objects.create(profile=profile, **fields)
+
+
+class ApiTestCase(APITestCase):
+    def setUp(self):
+        # Cached scope ids and login misses would otherwise leak between tests reusing pks
+        cache.clear()
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+class TherapistTypeTests(ApiTestCase):
+    def user_body(self, username, user_type):
+        return {
+            'username': username, 'email': f'{username}@example.com', 'password': 'pw-12345!',
+            'first_name': 'New', 'last_name': 'User', 'user_type': user_type,
+        }
+
+    def test_anonymous_signup_cannot_claim_therapist(self):
+        response = self.client.post('/api/v1/user/create', self.user_body('mallory', 'therapist'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('user_type', response.data)
+        self.assertFalse(User.objects.filter(username='mallory').exists())
+
+    def test_user_cannot_promote_self_to_therapist(self):
+        parent = make_user('parent')
+        self.login(parent)
+        response = self.client.put(f'/api/v1/user/update/{parent.pk}', self.user_body('parent', 'therapist'),
+                                   format='json')
+        self.assertEqual(response.status_code, 400)
+        parent.refresh_from_db()
+        self.assertEqual(parent.user_type, CustomUser.PARENT)
+
+    def test_staff_can_create_therapist(self):
+        self.login(make_user('admin', is_staff=True))
+        response = self.client.post('/api/v1/user/create', self.user_body('doc', 'therapist'), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(User.objects.get(username='doc').user_type, CustomUser.THERAPIST)
+
+    def test_signed_up_user_sees_only_own_profiles(self):
+        make_profile(make_user('victim'))
+        self.client.post('/api/v1/user/create', self.user_body('mallory', 'parent'), format='json')
+        self.login(User.objects.get(username='mallory'))
+        self.assertEqual(self.client.get('/api/v1/profile').data['results'], [])
+
+
+class ScopedWriteTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.episode = make_episode(self.profile)
+        self.other_profile = make_profile(make_user('other'))
+        self.other_episode = make_episode(self.other_profile)
+        self.login(self.parent)
+
+    def trigger_body(self, profile, episode):
+        return {
+            'profile': profile.pk, 'episode': episode.pk, 'trigger_type': 'noise', 'description': 'Loud',
+            'severity': 'Low', 'management_strategy': 'Headphones',
+        }
+
+    def episode_body(self, profile):
+        return {
+            'profile': profile.pk, 'title': 'Episode', 'description': 'Test', 'start_time': '2025-02-01T10:00:00Z',
+            'end_time': '2025-02-01T10:20:00Z', 'episode_date': '2025-02-01', 'severity': 'Low',
+        }
+
+    def test_create_on_own_profile(self):
+        response = self.client.post('/api/v1/trigger/create', self.trigger_body(self.profile, self.episode),
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_create_on_foreign_profile_is_rejected(self):
+        for profile, episode in [(self.other_profile, self.other_episode), (self.profile, self.other_episode)]:
+            response = self.client.post('/api/v1/trigger/create', self.trigger_body(profile, episode), format='json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/v1/episode/create', self.episode_body(self.other_profile), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Trigger.objects.exists())
+        self.assertEqual(Episode.objects.filter(profile=self.other_profile).count(), 1)
+
+    def test_ingest_on_foreign_profile_is_rejected(self):
+        body = {**self.episode_body(self.other_profile), 'triggers': [
+            {'trigger_type': 'noise', 'description': 'Loud', 'severity': 'Low', 'management_strategy': 'Leave'},
+        ]}
+        response = self.client.post('/api/v1/episode/ingest', body, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Episode.objects.filter(profile=self.other_profile).count(), 1)
+
+    def test_bulk_create_rejects_foreign_items_only(self):
+        response = self.client.post('/api/v1/trigger/bulk/create', [
+            self.trigger_body(self.profile, self.episode),
+            self.trigger_body(self.other_profile, self.other_episode),
+        ], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertFalse(Trigger.objects.filter(profile=self.other_profile).exists())
+
+    def test_update_cannot_move_row_to_foreign_profile(self):
+        trigger = Trigger.objects.create(**{
+            **self.trigger_body(self.profile, self.episode), 'profile': self.profile, 'episode': self.episode,
+        })
+        response = self.client.put(f'/api/v1/trigger/update/{trigger.pk}',
+                                   self.trigger_body(self.other_profile, self.other_episode), format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.put('/api/v1/trigger/bulk/update', [
+            {'id': trigger.pk, 'profile': self.other_profile.pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        trigger.refresh_from_db()
+        self.assertEqual((trigger.profile_id, trigger.episode_id), (self.profile.pk, self.episode.pk))
+
+    def test_staff_can_write_any_profile(self):
+        self.login(make_user('admin', is_staff=True))
+        response = self.client.post('/api/v1/trigger/create',
+                                    self.trigger_body(self.other_profile, self.other_episode), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class BulkTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.episode = make_episode(self.profile)
+        # id 1, the row a JSON true would alias
+        self.trigger = Trigger.objects.create(
+            pk=1, profile=self.profile, episode=self.episode, trigger_type='noise', description='Loud',
+            severity='Low', management_strategy='Leave',
+        )
+        self.login(self.parent)
+
+    def item(self, **extra):
+        return {'profile': self.profile.pk, 'episode': self.episode.pk, 'trigger_type': 'light',
+                'description': 'Bright', 'severity': 'Low', 'management_strategy': 'Dim', **extra}
+
+    def test_create_reports_each_item(self):
+        body = [self.item(), self.item(severity=None), self.item(episode='x')]
+        response = self.client.post('/api/v1/trigger/bulk/create', body, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['index'] for result in response.data['results']], [0])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('episode', response.data['errors'][1]['errors'])
+        self.assertEqual(Trigger.objects.filter(profile=self.profile).count(), 2)
+
+    def test_all_valid_and_all_invalid_statuses(self):
+        response = self.client.post('/api/v1/trigger/bulk/create', [self.item(), self.item()], format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/v1/trigger/bulk/create', [self.item(episode=None)], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'], [])
+
+    def test_update_reports_each_item(self):
+        body = [{'id': self.trigger.pk, 'description': 'Louder'}, {'id': 999, 'description': 'Missing'}]
+        response = self.client.put('/api/v1/trigger/bulk/update', body, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['results'][0]['data']['description'], 'Louder')
+        self.assertEqual(response.data['errors'], [{'index': 1, 'errors': {'id': ['Trigger not found']}}])
+
+    def test_boolean_ids_are_not_found(self):
+        response = self.client.put('/api/v1/trigger/bulk/update', [{'id': True, 'description': 'Hijacked'}],
+                                   format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete('/api/v1/trigger/bulk/delete', [True], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.trigger.refresh_from_db()
+        self.assertEqual((self.trigger.description, self.trigger.is_deleted), ('Loud', False))
+
+    def test_delete_soft_deletes_and_invalidates(self):
+        path = f'/api/v1/profile/{self.profile.pk}'
+        self.assertEqual(len(self.client.get(path).data['triggers']), 1)
+        self.assertEqual(self.client.get(path)['X-Cache'], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/v1/trigger/bulk/delete', [self.trigger.pk], format='json')
+        self.assertEqual(response.data['results'], [{'index': 0, 'id': self.trigger.pk}])
+        self.assertEqual(self.client.get(path).data['triggers'], [])
+        self.assertTrue(Trigger.all_objects.get(pk=self.trigger.pk).is_deleted)
+
+    def test_queryset_delete_keeps_the_django_contract(self):
+        self.assertEqual(Trigger.objects.filter(pk=self.trigger.pk).delete(), (1, {'my_app.Trigger': 1}))
+        self.assertFalse(Trigger.all_objects.filter(pk=self.trigger.pk).exists())
+
+    @override_settings(API_MAX_BULK_SIZE=2)
+    def test_batch_size_is_capped(self):
+        for method, path, body in [
+            ('post', '/api/v1/trigger/bulk/create', [self.item()] * 3),
+            ('put', '/api/v1/trigger/bulk/update', [{'id': self.trigger.pk}] * 3),
+            ('delete', '/api/v1/trigger/bulk/delete', [self.trigger.pk] * 3),
+        ]:
+            response = getattr(self.client, method)(path, body, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'error': 'At most 2 items per request'})
+        self.assertEqual(Trigger.objects.filter(profile=self.profile).count(), 1)
+
+
+@override_settings(REVOCATION_REFRESH_SECONDS=3600)
+class UserStateCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.other_profile = make_profile(make_user('other'))
+        user_state_cache.invalidate(self.parent.pk)
+        self.login(self.parent)
+
+    def user_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries if 'FROM "my_app_customuser"' in query['sql']]
+
+    def test_state_is_loaded_once_per_user(self):
+        self.assertEqual(len(self.user_queries('/api/v1/profile')), 1)
+        self.assertEqual(self.user_queries('/api/v1/profile'), [])
+
+    def test_update_user_is_seen_by_the_next_request(self):
+        self.assertEqual([row['id'] for row in self.client.get('/api/v1/profile').data['results']], [self.profile.pk])
+        staff = make_user('staff', is_staff=True)
+        self.login(staff)
+        body = {'username': 'parent', 'first_name': 'A', 'last_name': 'B', 'email': 'parent@example.com',
+                'password': 'pw-12345!', 'user_type': CustomUser.THERAPIST}
+        self.assertEqual(self.client.put(f'/api/v1/user/update/{self.parent.pk}', body, format='json').status_code, 200)
+        self.login(self.parent)
+        rows = self.client.get('/api/v1/profile').data['results']
+        self.assertEqual({row['id'] for row in rows}, {self.profile.pk, self.other_profile.pk})
+
+    def test_delete_user_is_seen_by_the_next_request(self):
+        self.assertEqual(self.client.get('/api/v1/profile').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/v1/user/delete/{self.parent.pk}').status_code, 204)
+        self.assertEqual(self.client.get('/api/v1/profile').status_code, 401)
+
+
+class LoginNegativeCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        make_user('alice')
+
+    def test_padded_miss_does_not_lock_out_real_username(self):
+        self.assertIsNone(authenticate(username='alice ', password='pw-12345!'))
+        self.assertIsNotNone(authenticate(username='alice', password='pw-12345!'))
+        self.assertIsNotNone(authenticate(username='ALICE', password='pw-12345!'))
+
+    def test_async_login_trims_like_sync_login(self):
+        body = {'username': ' alice ', 'password': 'pw-12345!'}
+        for url in ('/api/token/login', '/api/token/login/async'):
+            response = self.client.post(url, body, format='json')
+            self.assertEqual(response.status_code, 200, url)
+        response = self.client.post('/api/token/login/async', {'username': '  ', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json())
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        self.user = make_user('legacy')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def run_import(self, records, **options):
+        path = os.path.join(self.tmp.name, 'records.jsonl')
+        with open(path, 'w', encoding='utf-8') as handle:
+            for resource, row in records:
+                handle.write(json.dumps({'resource': resource, 'row': row}) + '\n')
+        errors = io.StringIO()
+        importer = Importer(Checkpoint(os.path.join(self.tmp.name, 'checkpoint.ndjson')), use_copy=False,
+                            errors=errors, **options)
+        importer.import_file(path)
+        return importer, [json.loads(line) for line in errors.getvalue().splitlines()]
+
+    def profile_row(self):
+        return {
+            'id': 900, 'user_id': self.user.pk, 'first_name': 'Old', 'last_name': 'Record', 'severity': 'Low',
+            'date_of_birth': '2012-03-04', 'diagnosis_date': '2016-05-06', 'communication_level': 'verbal',
+            'created_at': '2019-01-02T03:04:05+00:00', 'updated_at': '2020-01-02T03:04:05+00:00',
+        }
+
+    def trigger_row(self, episode_id):
+        return {
+            'id': 77, 'profile_id': 900, 'episode_id': episode_id, 'trigger_type': 'noise', 'description': 'Loud',
+            'severity': 'Low', 'management_strategy': 'Leave', 'timestamp': '2019-06-01T10:05:00+00:00',
+            'created_at': '2019-06-01T11:00:00+00:00', 'updated_at': '2019-06-02T11:00:00+00:00',
+        }
+
+    def test_legacy_timestamps_are_kept(self):
+        episode = {
+            'id': 500, 'profile_id': 900, 'title': 'Old', 'description': 'Legacy', 'severity': 'High',
+            'start_time': '2019-06-01T10:00:00+00:00', 'end_time': '2019-06-01T10:30:00+00:00',
+            'episode_date': '2019-06-01', 'created_at': '2019-06-01T11:00:00+00:00',
+        }
+        started = datetime.now(timezone.utc)
+        importer, errors = self.run_import([
+            ('profiles', self.profile_row()), ('episodes', episode), ('triggers', self.trigger_row(500)),
+        ])
+        self.assertEqual(errors, [])
+        profile = Profile.objects.get(first_name='Old')
+        self.assertEqual(profile.created_at, datetime(2019, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+        # updated_at is the import time, so clients that synced before the import still get the rows
+        self.assertGreaterEqual(profile.updated_at, started)
+        trigger = Trigger.objects.get(profile=profile)
+        self.assertEqual(trigger.timestamp, datetime(2019, 6, 1, 10, 5, tzinfo=timezone.utc))
+        self.assertEqual(trigger.episode.created_at, datetime(2019, 6, 1, 11, tzinfo=timezone.utc))
+        self.assertEqual(trigger.episode.severity, 'High')
+
+    def test_unmapped_reference_is_rejected(self):
+        existing = make_episode(make_profile(self.user))
+        importer, errors = self.run_import([('profiles', self.profile_row()), ('triggers', self.trigger_row(existing.pk))])
+        self.assertEqual(importer.rejected['triggers'], 1)
+        self.assertIn('episode', errors[0]['errors'])
+        self.assertFalse(Trigger.objects.exists())
+
+    def test_allow_existing_ids_falls_back_to_existing_rows(self):
+        existing = make_episode(make_profile(self.user))
+        importer, errors = self.run_import([('profiles', self.profile_row()), ('triggers', self.trigger_row(existing.pk))],
+                                           allow_existing_ids=True)
+        self.assertEqual(errors, [])
+        self.assertEqual(Trigger.objects.get().episode, existing)
+
+
+class ConditionalListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.episodes = [make_episode(self.profile) for _ in range(3)]
+        self.login(self.parent)
+
+    def test_unchanged_page_answers_304(self):
+        response = self.client.get('/api/v1/episode?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get('/api/v1/episode?page_size=2', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_page_etag_follows_rows_in_and_out_of_the_page(self):
+        etag = self.client.get('/api/v1/episode?page_size=2')['ETag']
+        newest = self.episodes[-1]
+        self.client.delete(f'/api/v1/episode/delete/{newest.pk}')
+        response = self.client.get('/api/v1/episode?page_size=2', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(newest.pk, [row['id'] for row in response.data['results']])
+
+    def test_other_pages_do_not_change_the_etag(self):
+        etag = self.client.get('/api/v1/episode?page_size=1')['ETag']
+        Episode.objects.filter(pk=self.episodes[0].pk).update(title='Changed', updated_at=datetime.now(timezone.utc))
+        response = self.client.get('/api/v1/episode?page_size=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class PaginationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        # Seven episodes sharing one created_at, lasting 10, 10, 10, 20, 20, 30 and 30 minutes
+        minutes = [10, 10, 10, 20, 20, 30, 30]
+        self.episodes = [
+            make_episode(self.profile, end_time=f'2025-01-01T10:{length}:00Z') for length in minutes
+        ]
+        Episode.objects.update(created_at=datetime(2025, 1, 1, tzinfo=timezone.utc))
+        self.login(self.parent)
+
+    def walk(self, path, page_size):
+        ids, cursor = [], None
+        while True:
+            params = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(path, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), page_size)
+            ids += [row['id'] for row in response.data['results']]
+            cursor = response.data['cursor']
+            if cursor is None:
+                return ids
+
+    def test_cursor_pages_through_tied_created_at(self):
+        ids = self.walk('/api/v1/episode', 3)
+        self.assertEqual(ids, sorted((episode.pk for episode in self.episodes), reverse=True))
+
+    def test_duration_ordering_pages_without_duplicates(self):
+        ids = self.walk('/api/v1/episode?ordering=-duration', 2)
+        by_duration = sorted(self.episodes, key=lambda episode: (episode.duration, episode.pk), reverse=True)
+        self.assertEqual(ids, [episode.pk for episode in by_duration])
+
+    @override_settings(API_MAX_PAGE_SIZE=4)
+    def test_page_size_is_clamped(self):
+        response = self.client.get('/api/v1/episode', {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNotNone(response.data['cursor'])
+
+    def test_malformed_cursor_is_not_found(self):
+        for cursor in ['not-base64!', 'W10=', 'WyJub3QtYS1kYXRlIiwgMV0=']:  # garbage, [], ["not-a-date", 1]
+            response = self.client.get('/api/v1/episode', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class StreamingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.episodes = [make_episode(self.profile) for _ in range(3)]
+        self.login(self.parent)
+
+    def test_wsgi_stream_is_a_sync_iterator(self):
+        response = self.client.get('/api/v1/episode?stream=1')
+        self.assertFalse(response.is_async)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([row['id'] for row in rows], [episode.pk for episode in reversed(self.episodes)])
+
+    async def test_asgi_stream_is_not_buffered(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.parent)}'}
+        response = await self.async_client.get('/api/v1/episode', {'stream': '1'}, headers=headers)
+        self.assertTrue(response.is_async)
+        rows = json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual([row['id'] for row in rows], [episode.pk for episode in reversed(self.episodes)])
+
+    async def test_asgi_export_is_not_buffered(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.parent)}'}
+        response = await self.async_client.get('/api/v1/export', headers=headers)
+        self.assertTrue(response.is_async)
+        lines = gzip.decompress(b''.join([chunk async for chunk in response.streaming_content])).splitlines()
+        records = [json.loads(line) for line in lines]
+        episodes = [record['row']['id'] for record in records if record['resource'] == 'episodes']
+        self.assertEqual(episodes, [episode.pk for episode in self.episodes])
+
+
+class EpisodeRollupTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.login(self.parent)
+
+    def episode_body(self, day, severity, minutes=30):
+        return {
+            'profile': self.profile.pk, 'title': 'Episode', 'description': 'Test', 'episode_date': day,
+            'start_time': f'{day}T10:00:00Z', 'end_time': f'{day}T10:{minutes:02d}:00Z', 'severity': severity,
+        }
+
+    def rollups(self):
+        return sorted(EpisodeRollup.objects.values_list(
+            'profile_id', 'period', 'period_start', 'episode_count', 'total_duration',
+            'low_count', 'medium_count', 'high_count',
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollups())
+
+    def test_api_episodes_keep_their_severity(self):
+        response = self.client.post('/api/v1/episode/create', self.episode_body('2025-03-03', 'High'), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['severity'], 'High')
+        response = self.client.post('/api/v1/episode/ingest', self.episode_body('2025-03-03', 'Medium'), format='json')
+        self.assertEqual(response.status_code, 201)
+        month = EpisodeRollup.objects.get(period=EpisodeRollup.MONTH)
+        self.assertEqual((month.low_count, month.medium_count, month.high_count), (0, 1, 1))
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        ids = []
+        for day, severity in [('2025-03-03', 'High'), ('2025-03-04', 'Low'), ('2025-03-04', 'Low')]:
+            response = self.client.post('/api/v1/episode/create', self.episode_body(day, severity), format='json')
+            ids.append(response.data['id'])
+        self.assertMatchesRebuild()
+
+        # Moved to another month with another severity and duration
+        self.client.put(f'/api/v1/episode/update/{ids[0]}', self.episode_body('2025-04-10', 'Medium', 45),
+                        format='json')
+        self.assertMatchesRebuild()
+        # Saved without touching the rolled-up columns
+        self.client.put(f'/api/v1/episode/update/{ids[0]}', self.episode_body('2025-04-10', 'Medium', 45),
+                        format='json')
+        self.assertMatchesRebuild()
+
+        self.client.delete(f'/api/v1/episode/delete/{ids[1]}')
+        self.assertMatchesRebuild()
+        Episode.all_objects.get(pk=ids[2]).hard_delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(EpisodeRollup.objects.filter(period_start='2025-03-04').exists())
+
+
+@override_settings(REVOCATION_REFRESH_SECONDS=3600)
+class ProfileQueryCountTests(ApiTestCase):
+    """The nested profile payloads are prefetched: their query count must not grow with the data."""
+
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        admin = make_user('admin', is_staff=True)
+        self.login(admin)
+        # The per-process revocation filter and JWT user state reload on timers: load them
+        # now so that no reload lands inside a measurement
+        user_state_cache.invalidate(admin.pk)
+        revocation_store._next_refresh = 0.0
+        self.client.get('/api/v1/profile')
+
+    def add_profile(self, children):
+        profile = make_profile(self.parent)
+        for _ in range(children):
+            episode = make_episode(profile)
+            Trigger.objects.create(profile=profile, episode=episode, trigger_type='noise', description='Loud',
+                                   severity='Low', management_strategy='Leave')
+            behavior = Behavior.objects.create(profile=profile, episode=episode, behavior_type='stimming',
+                                               description='Rocking', frequency=2, context='Class')
+            Intervention.objects.create(profile=profile, episode=episode, behavior=behavior,
+                                        intervention_type='quiet space', description='Break', effectiveness='effective')
+            Session.objects.create(profile=profile, session_date='2025-01-02', therapist='Dr Test', notes='Notes',
+                                   goals='Goals')
+        return profile
+
+    def count_queries(self, url):
+        cache.clear()  # Measure the uncached path
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_profile_list_queries_do_not_grow_with_rows(self):
+        self.add_profile(children=1)
+        few = self.count_queries('/api/v1/profile')
+        for _ in range(4):
+            self.add_profile(children=3)
+        self.assertEqual(self.count_queries('/api/v1/profile'), few)
+
+    def test_profile_detail_queries_do_not_grow_with_children(self):
+        few = self.count_queries(f'/api/v1/profile/{self.add_profile(children=1).pk}')
+        many = self.count_queries(f'/api/v1/profile/{self.add_profile(children=5).pk}')
+        self.assertEqual(many, few)
+
+    def test_user_detail_queries_do_not_grow_with_profiles(self):
+        self.add_profile(children=1)
+        few = self.count_queries(f'/api/v1/user/{self.parent.pk}')
+        for _ in range(3):
+            self.add_profile(children=2)
+        self.assertEqual(self.count_queries(f'/api/v1/user/{self.parent.pk}'), few)
+
+
+class MetricsShardTests(TestCase):
+    def record_in_threads(self, count):
+        def record():
+            series = metrics._shard().setdefault(('test-view', 'GET', 2), [0] * 6)
+            series[0] += 1
+
+        threads = [threading.Thread(target=record) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_exited_threads_are_folded_into_the_totals(self):
+        before = metrics.snapshot().get(('test-view', 'GET', 2), [0])[0]
+        self.record_in_threads(20)
+        self.assertEqual(metrics.snapshot()[('test-view', 'GET', 2)][0], before + 20)
+        self.assertFalse(any(not thread.is_alive() for thread, _ in metrics._shards))
+        # Folding again (another scrape) must not count the retired shards twice
+        self.assertEqual(metrics.snapshot()[('test-view', 'GET', 2)][0], before + 20)
+
+    def test_new_threads_release_exited_shards_without_a_scrape(self):
+        for _ in range(10):
+            self.record_in_threads(1)
+        # Each new thread folds the ones that exited before it; only the last is left
+        self.assertLessEqual(sum(not thread.is_alive() for thread, _ in metrics._shards), 1)
+
+
+class MetricsSerializerTimeTests(ApiTestCase):
+    def serializer_seconds(self, key):
+        return metrics.snapshot().get(key, [0.0] * 5)[-2]
+
+    def test_list_and_detail_helpers_record_serializer_time(self):
+        parent = make_user('parent')
+        episode = make_episode(make_profile(parent))
+        self.login(parent)
+        for path, view in [('/api/v1/episode', 'episode_list'), (f'/api/v1/episode/{episode.pk}', 'single_episode')]:
+            key = (f'my_app.views.{view}', 'GET', 2)
+            before = self.serializer_seconds(key)
+            self.assertEqual(self.client.get(path).status_code, 200)
+            self.assertGreater(self.serializer_seconds(key), before)
+
+    def test_serializers_are_not_patched(self):
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.login(self.parent)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get('/api/v1/sync', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_deleted_profile_tombstone_reaches_its_owner(self):
+        first = self.sync()
+        self.assertEqual([row['id'] for row in first['changes']['profiles']['updated']], [self.profile.pk])
+        self.client.delete(f'/api/v1/profile/delete/{self.profile.pk}')
+        changes = self.sync(first['token'])['changes']['profiles']
+        self.assertEqual(changes, {'updated': [], 'deleted': [self.profile.pk]})
+
+    def test_token_returns_only_later_changes(self):
+        first = make_episode(self.profile)
+        data = self.sync()
+        self.assertEqual([row['id'] for row in data['changes']['episodes']['updated']], [first.pk])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.sync(data['token'])['changes']['episodes'], {'updated': [], 'deleted': []})
+
+        second = make_episode(self.profile)
+        make_episode(make_profile(make_user('other')))
+        changes = self.sync(data['token'])['changes']['episodes']
+        self.assertEqual([row['id'] for row in changes['updated']], [second.pk])
+
+    def test_child_tombstones(self):
+        episode = make_episode(self.profile)
+        token = self.sync()['token']
+        self.client.delete(f'/api/v1/episode/delete/{episode.pk}')
+        self.assertEqual(self.sync(token)['changes']['episodes'], {'updated': [], 'deleted': [episode.pk]})
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_has_more_pages_through_tied_updated_at(self):
+        episodes = [make_episode(self.profile) for _ in range(5)]
+        Episode.objects.update(updated_at=datetime(2025, 1, 1, tzinfo=timezone.utc))
+        ids, token, has_more = [], None, True
+        while has_more:
+            data = self.sync(token)
+            ids += [row['id'] for row in data['changes']['episodes']['updated']]
+            token, has_more = data['token'], data['has_more']
+        self.assertEqual(ids, [episode.pk for episode in episodes])
+
+    def test_invalid_since_is_rejected(self):
+        for since in ['not-base64!', 'W10=', 'eyJlcGlzb2RlcyI6IDV9']:  # garbage, [], {"episodes": 5}
+            response = self.client.get('/api/v1/sync', {'since': since})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('since', response.data)
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_unsettled_rows_wait_for_the_next_sync(self):
+        make_episode(self.profile)
+        self.assertEqual(self.sync()['changes']['episodes']['updated'], [])
+
+
+class TimelineTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+        self.login(self.parent)
+
+    def at(self, day, hour, minute=0):
+        return datetime(2025, 1, day, hour, minute, tzinfo=timezone.utc)
+
+    def add_episode(self, start):
+        return make_episode(self.profile, start_time=start, end_time=start + timedelta(minutes=30),
+                            episode_date=start.date())
+
+    def add_children(self, episode, timestamp):
+        # auto_now_add timestamps are overwritten afterwards to build ties across streams
+        trigger = Trigger.objects.create(profile=self.profile, episode=episode, trigger_type='noise',
+                                         description='Loud', severity='Low', management_strategy='Leave')
+        behavior = Behavior.objects.create(profile=self.profile, episode=episode, behavior_type='stimming',
+                                           description='Rocking', frequency=2, context='Class')
+        intervention = Intervention.objects.create(profile=self.profile, episode=episode, behavior=behavior,
+                                                   intervention_type='quiet space', description='Break',
+                                                   effectiveness='effective')
+        for row in (trigger, behavior, intervention):
+            type(row).objects.filter(pk=row.pk).update(timestamp=timestamp)
+        return trigger, behavior, intervention
+
+    def add_session(self, day):
+        return Session.objects.create(profile=self.profile, session_date=f'2025-01-{day:02d}', therapist='Dr Test',
+                                      notes='Notes', goals='Goals')
+
+    def walk(self, page_size, max_entries):
+        entries, cursor = [], None
+        while len(entries) <= max_entries:  # A cursor that does not advance fails instead of looping
+            params = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(f'/api/v1/profile/{self.profile.pk}/timeline', params)
+            self.assertEqual(response.status_code, 200)
+            entries += [(entry['type'], entry['data']['id']) for entry in response.data['results']]
+            cursor = response.data['cursor']
+            if cursor is None:
+                break
+        return entries
+
+    def test_cursor_pages_through_all_streams(self):
+        expected = []  # (time, id, -stream order, type), sorted newest first below
+        order = {'episode': 0, 'session': 1, 'trigger': 2, 'behavior': 3, 'intervention': 4}
+
+        def add(kind, row, when):
+            expected.append((when, row.pk, -order[kind], kind))
+
+        for day in (1, 2, 3):
+            episode = self.add_episode(self.at(day, 10))
+            add('episode', episode, self.at(day, 10))
+            # Two sets of children at the same instant: ties inside and across streams
+            for _ in range(2):
+                children = self.add_children(episode, self.at(day, 10))
+                for kind, row in zip(('trigger', 'behavior', 'intervention'), children):
+                    add(kind, row, self.at(day, 10))
+            session = self.add_session(day)
+            add('session', session, self.at(day, 0))
+        expected = [(kind, pk) for _, pk, _, kind in sorted(expected, reverse=True)]
+
+        for page_size in (1, 2, 5, 7, len(expected), len(expected) + 1):
+            self.assertEqual(self.walk(page_size, len(expected)), expected, page_size)
+
+    def test_sessions_are_placed_at_midnight(self):
+        episode = self.add_episode(self.at(1, 23, 59))
+        self.add_children(episode, self.at(2, 0, 1))
+        session = self.add_session(2)
+        response = self.client.get(f'/api/v1/profile/{self.profile.pk}/timeline')
+        results = [(entry['type'], entry['time']) for entry in response.data['results']]
+        # Between the children logged one minute after midnight and the episode the evening before
+        self.assertEqual({kind for kind, _ in results[:3]}, {'trigger', 'behavior', 'intervention'})
+        self.assertEqual(results[3:], [('session', '2025-01-02T00:00:00+00:00'),
+                                       ('episode', '2025-01-01T23:59:00+00:00')])
+        self.assertEqual(response.data['results'][3]['data']['id'], session.pk)
+
+
+@override_settings(REVOCATION_REFRESH_SECONDS=3600)
+class RevocationTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.refresh = RefreshToken.for_user(self.parent)
+        self.access = self.refresh.access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        revocation_store._filter = None  # Rebuilt from this test's table on first use
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        self.assertEqual(self.client.get('/api/v1/profile').status_code, 200)
+        response = self.client.post('/api/token/logout/', {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/profile').status_code, 401)
+        self.client.credentials()
+        response = self.client.post('/api/token/refresh/', {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_process_revocation_is_picked_up_on_refresh(self):
+        self.assertEqual(self.client.get('/api/v1/profile').status_code, 200)
+        # Written straight to the table, as another worker's logout would
+        RevokedToken.objects.create(jti=self.access['jti'], expires_at=datetime.now(timezone.utc) + timedelta(hours=1))
+        self.assertEqual(self.client.get('/api/v1/profile').status_code, 200)  # Until the next refresh
+        revocation_store._next_refresh = 0.0
+        with mock.patch.object(revocation_store, '_rebuild', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(self.client.get('/api/v1/profile').status_code, 401)
+
+    def test_prune_drops_expired_rows_only(self):
+        now = datetime.now(timezone.utc)
+        RevokedToken.objects.create(jti='expired', expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti='live', expires_at=now + timedelta(minutes=1))
+        self.assertEqual(revocation_store.prune(), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertTrue(revocation_store.is_revoked('live'))
+        self.assertFalse(revocation_store.is_revoked('expired'))
+
+
+class MovedRowCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        parent = make_user('parent')
+        self.first, self.second = make_profile(parent), make_profile(parent)
+        self.episode = make_episode(self.second)
+        self.trigger = Trigger.objects.create(
+            profile=self.first, episode=make_episode(self.first), trigger_type='noise', description='Loud',
+            severity='Low', management_strategy='Leave',
+        )
+        self.login(parent)
+
+    def cached_trigger_ids(self, profile):
+        response = self.client.get(f'/api/v1/profile/{profile.pk}')
+        return response['X-Cache'], [row['id'] for row in response.data['triggers']]
+
+    def assertLeavesOldProfile(self, move):
+        self.assertEqual(self.cached_trigger_ids(self.first)[1], [self.trigger.pk])
+        self.assertEqual(self.cached_trigger_ids(self.first), ('HIT', [self.trigger.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = move()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cached_trigger_ids(self.first), ('MISS', []))
+        self.assertEqual(self.cached_trigger_ids(self.second)[1], [self.trigger.pk])
+
+    def test_update_invalidates_the_profile_a_row_leaves(self):
+        body = {'profile': self.second.pk, 'episode': self.episode.pk, 'trigger_type': 'noise', 'description': 'Loud',
+                'severity': 'Low', 'management_strategy': 'Leave'}
+        self.assertLeavesOldProfile(
+            lambda: self.client.put(f'/api/v1/trigger/update/{self.trigger.pk}', body, format='json')
+        )
+
+    def test_bulk_update_invalidates_the_profile_a_row_leaves(self):
+        body = [{'id': self.trigger.pk, 'profile': self.second.pk, 'episode': self.episode.pk}]
+        self.assertLeavesOldProfile(lambda: self.client.put('/api/v1/trigger/bulk/update', body, format='json'))
+
+
+class ScopeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.parent = make_user('parent')
+        self.profile = make_profile(self.parent)
+
+    def test_per_process_cache_is_bypassed(self):
+        # Another worker's write cannot invalidate this process's locmem entry
+        cache.set(_profile_ids_key(self.parent.pk), [], 300)
+        self.assertEqual(owned_profile_ids(self.parent.pk), [self.profile.pk])
+
+    def test_shared_cache_is_used(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            self.assertEqual(owned_profile_ids(self.parent.pk), [self.profile.pk])
+            with self.assertNumQueries(0):
+                self.assertEqual(owned_profile_ids(self.parent.pk), [self.profile.pk])
+
+
+class ConditionalDetailTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = make_user('parent')
+        self.first, self.second = make_profile(self.parent), make_profile(self.parent)
+        self.triggers = [
+            Trigger.objects.create(profile=self.first, episode=make_episode(self.first), trigger_type='noise',
+                                   description='Loud', severity='Low', management_strategy='Leave')
+            for _ in range(2)
+        ]
+        self.login(self.parent)
+
+    def etag(self):
+        return self.client.get(f'/api/v1/profile/{self.first.pk}')['ETag']
+
+    def assertChanged(self, etag):
+        response = self.client.get(f'/api/v1/profile/{self.first.pk}', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_child_moved_away_changes_the_etag(self):
+        etag = self.etag()
+        older = self.triggers[0]
+        response = self.client.put('/api/v1/trigger/bulk/update', [
+            {'id': older.pk, 'profile': self.second.pk, 'episode': make_episode(self.second).pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertChanged(etag)
+
+    def test_hard_deleted_child_changes_the_etag(self):
+        etag = self.etag()
+        self.triggers[0].hard_delete()
+        self.assertChanged(etag)
+
+    def test_hard_deleted_child_changes_the_list_etag(self):
+        etag = self.client.get('/api/v1/profile')['ETag']
+        self.triggers[0].hard_delete()
+        response = self.client.get('/api/v1/profile', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,101 @@
+import base64
+import heapq
+import json
+from datetime import date, datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Episode, Session, Trigger, Behavior, Intervention
+from .my_serializers import (
+    EpisodeSerializer, SessionSerializer, TriggerSerializer, BehaviorSerializer, InterventionSerializer,
+)
+from .pagination import KeysetPagination
+
+
+# Per-profile care timeline, newest first. Each stream is read with its own keyset
+# query on a (profile, <time column>) index -- at most page_size + 1 rows each -- and
+# the five sorted pages are k-way merged. The cursor stores every stream's last
+# consumed (time, id), so the next page resumes each stream exactly where it stopped.
+TIMELINE_STREAMS = [
+    ('episode', Episode, EpisodeSerializer, 'start_time'),
+    ('session', Session, SessionSerializer, 'session_date'),
+    ('trigger', Trigger, TriggerSerializer, 'timestamp'),
+    ('behavior', Behavior, BehaviorSerializer, 'timestamp'),
+    ('intervention', Intervention, InterventionSerializer, 'timestamp'),
+]
+
+
+def _sort_time(value):
+    # Sessions only have a date: place them at the start of that day
+    if isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def encode_cursor(positions):
+    return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+
+def decode_cursor(encoded, streams=TIMELINE_STREAMS):
+    if not encoded:
+        return {}
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        decoded = {}
+        for name, model, _, field in streams:
+            if name not in positions:
+                continue
+            value, pk = positions[name]
+            is_date = model._meta.get_field(field).get_internal_type() == 'DateField'
+            decoded[name] = ((date if is_date else datetime).fromisoformat(value), int(pk))
+        return decoded
+    except (TypeError, ValueError, AttributeError):
+        raise NotFound('Invalid cursor')
+
+
+def _stream_page(model, field, profile_id, position, limit):
+    queryset = model.objects.filter(profile_id=profile_id)
+    if position is not None:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    return list(queryset.order_by(f'-{field}', '-pk')[:limit])
+
+
+def build_timeline(request, profile_id):
+    """Return the paginated timeline payload ({next, cursor, results}) for one profile."""
+    page_size = KeysetPagination().get_page_size(request)
+    positions = decode_cursor(getattr(request, 'query_params', request.GET).get('cursor'))
+
+    heads = []
+    for order, (name, model, serializer_class, field) in enumerate(TIMELINE_STREAMS):
+        rows = _stream_page(model, field, profile_id, positions.get(name), page_size + 1)
+        # Each stream is already sorted newest first by this key; equal times fall back
+        # to id and then stream order, so the merge is deterministic
+        heads.append([
+            ((_sort_time(getattr(row, field)), row.pk, -order), name, field, serializer_class, row)
+            for row in rows
+        ])
+
+    merged = heapq.merge(*heads, key=lambda item: item[0], reverse=True)
+    results, next_positions = [], {
+        name: [value.isoformat(), pk] for name, (value, pk) in positions.items()
+    }
+    has_more = False
+    for item in merged:
+        if len(results) == page_size:
+            has_more = True
+            break
+        (sort_time, _, _), name, field, serializer_class, row = item
+        results.append({
+            'type': name,
+            'time': sort_time.isoformat(),
+            'data': serializer_class(row).data,
+        })
+        next_positions[name] = [getattr(row, field).isoformat(), row.pk]
+
+    cursor = encode_cursor(next_positions) if has_more else None
+    next_link = replace_query_param(request.build_absolute_uri(), 'cursor', cursor) if cursor else None
+    return {'next': next_link, 'cursor': cursor, 'results': results}
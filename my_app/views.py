@@ -1,17 +1,40 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from my_app.models import Profile, Trigger, Behavior, Intervention, Session, Episode, Therapist, School
+from my_app.models import Profile, Trigger, Behavior, Intervention, Session, Episode, EpisodeRollup, Therapist, School
 from my_app.my_serializers import (
     ProfileSerializer, TriggerSerializer, BehaviorSerializer,
     InterventionSerializer, SessionSerializer, UserSerializer, CustomTokenObtainPairSerializer, EpisodeSerializer,
-    SchoolSerializer, TherapistSerializer
+    EpisodeIngestSerializer, EpisodeRollupSerializer,
+    SchoolSerializer, TherapistSerializer, login_payload, LogoutSerializer, RevocableTokenRefreshSerializer
 )
+from my_app.authentication import EmailOrUsernameModelBackend
+from my_app.password_pool import PoolSaturated
+from my_app.revocation import revocation_store
+from my_app.query_planner import optimize_queryset
+from my_app.pagination import KeysetPagination
+from my_app.filters import filter_queryset, parse_date_param, requested_ordering
+from my_app.scoping import forget_profile_ids, scope_queryset, syncable_profile_ids, visible_profile_ids
+from my_app.streaming import stream_json_list, streaming_content, wants_stream
+from my_app import bulk
+from my_app.sync import collect_changes
+from my_app.export import iter_export_lines, iter_gzip
+from my_app.timeline import build_timeline
+from my_app.conditional import detail_validators, list_validators, not_modified, set_validators
+from my_app import caching
+from my_app.metrics import render_metrics, timed_serialization
 
 User = get_user_model()
 
@@ -22,16 +45,85 @@ def soft_delete(instance):
     instance.save()
 
 
+# Helper: the model's rows visible to the caller (owner scoping, see my_app.scoping)
+def visible(request, model):
+    return scope_queryset(model.objects.all(), request.user)
+
+
 # Helper for 404 responses
 def handle_not_found(model_name):
     return Response({'error': f'{model_name} not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+# Helper for list responses: keyset-paginated by default, streamed with ?stream=1,
+# sorted by ?ordering=-<field> where the model allows it (see my_app.filters).
+# Answers 304 when the client's ETag / Last-Modified still match; with cached=True
+# the page payload is served from the versioned serialized cache.
+def list_response(request, queryset, serializer_class, ordering_field='created_at', cached=False):
+    ordering_field = requested_ordering(request, queryset.model, ordering_field)
+    # A stream carries the whole list, a page only its own rows, and so do their validators
+    streamed = wants_stream(request)
+    paginator = None if streamed else KeysetPagination(ordering_field)
+    validators = list_validators(request, queryset, serializer_class, paginator)
+    response = not_modified(request, validators)
+    if response is not None:
+        return response
+    if streamed:
+        response = stream_json_list(request, queryset.order_by(f'-{ordering_field}', '-pk'), serializer_class)
+        return set_validators(response, validators)
+
+    def build():
+        paginator = KeysetPagination(ordering_field)
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = serializer_class(page, many=True)
+        with timed_serialization():
+            data = serializer.data
+        return paginator.get_paginated_response(data).data
+
+    if cached:
+        data, hit = caching.cached_list(queryset.model, request, build)
+        response = Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+    else:
+        response = Response(build())
+    return set_validators(response, validators)
+
+
+# Helper for detail responses, with the same conditional GET and caching options
+def detail_response(request, queryset, serializer_class, cached=False, **lookup):
+    validators = detail_validators(queryset.filter(**lookup), serializer_class)
+    response = not_modified(request, validators)
+    if response is not None:
+        return response
+    if cached and validators is None:
+        # No visible row (missing, or outside the caller's scope): never answer from the cache
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+    def build():
+        instance = get_object_or_404(queryset, **lookup)
+        with timed_serialization():
+            return serializer_class(instance).data
+
+    if cached:
+        data, hit = caching.cached_object(queryset.model, lookup['id'], build)
+        response = Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+    else:
+        response = Response(build())
+    return set_validators(response, validators)
+
+
+# Helper for the nested /profile/<id>/<children> lists: the filtered list, scoped to one profile
+def profile_children_response(request, profile_id, queryset, serializer_class):
+    if not visible(request, Profile).filter(id=profile_id).exists():
+        return handle_not_found('Profile')
+    children = filter_queryset(queryset.filter(profile_id=profile_id), request)
+    return list_response(request, children, serializer_class)
+
+
 # USER VIEWS
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def create_user(request):
-    serializer = UserSerializer(data=request.data)
+    serializer = UserSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         user = serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -41,24 +133,32 @@ def create_user(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def user_list(request):
-    users = User.objects.filter(is_deleted=False)
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    users = optimize_queryset(scope_queryset(User.objects.filter(is_deleted=False), request.user), UserSerializer)
+    return list_response(request, users, UserSerializer, 'date_joined')
 
 
 @api_view(['GET'])
 
 def single_user(request, user_id):
-    user = get_object_or_404(User, id=user_id, is_deleted=False)
+    users = optimize_queryset(scope_queryset(User.objects.all(), request.user), UserSerializer)
+    user = get_object_or_404(users, id=user_id, is_deleted=False)
     serializer = UserSerializer(user)
     return Response(serializer.data)
 
 
+# Full nested graph for the logged-in user, fetched after the compact login response
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def current_user(request):
+    users = optimize_queryset(User.objects.all(), UserSerializer)
+    return detail_response(request, users, UserSerializer, id=request.user.id)
+
+
 @api_view(['PUT'])
 
 def update_user(request, user_id):
-    user = get_object_or_404(User, id=user_id, is_deleted=False)
-    serializer = UserSerializer(user, data=request.data)
+    user = get_object_or_404(scope_queryset(User.objects.all(), request.user), id=user_id, is_deleted=False)
+    serializer = UserSerializer(user, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -68,7 +168,7 @@ def update_user(request, user_id):
 @api_view(['DELETE'])
 
 def delete_user(request, user_id):
-    user = get_object_or_404(User, id=user_id, is_deleted=False)
+    user = get_object_or_404(scope_queryset(User.objects.all(), request.user), id=user_id, is_deleted=False)
     soft_delete(user)
     return Response({'message': 'User soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
@@ -79,8 +179,8 @@ def delete_user(request, user_id):
 def create_profile(request):
     user_id = request.data.get('user_id')
     print(f"user_id: {user_id}")
-    user = get_object_or_404(User, id=user_id)
-    serializer = ProfileSerializer(data=request.data)
+    user = get_object_or_404(scope_queryset(User.objects.all(), request.user), id=user_id)
+    serializer = ProfileSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save(user=user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -91,31 +191,84 @@ def create_profile(request):
 
 @api_view(['GET'])
 def profile_list(request):
-    profiles = Profile.objects.filter(is_deleted=False)
-    serializer = ProfileSerializer(profiles, many=True)
-    return Response(serializer.data)
+    profiles = optimize_queryset(visible(request, Profile), ProfileSerializer)
+    return list_response(request, profiles, ProfileSerializer)
 
 
 @api_view(['GET'])
 def single_profile(request, profile_id):
-    profile = get_object_or_404(Profile, id=profile_id, is_deleted=False)
-    serializer = ProfileSerializer(profile)
-    return Response(serializer.data)
+    profiles = optimize_queryset(visible(request, Profile), ProfileSerializer)
+    return detail_response(request, profiles, ProfileSerializer, cached=True, id=profile_id)
+
+
+@api_view(['GET'])
+def profile_episodes(request, profile_id):
+    return profile_children_response(request, profile_id, visible(request, Episode), EpisodeSerializer)
+
+
+@api_view(['GET'])
+def profile_triggers(request, profile_id):
+    return profile_children_response(request, profile_id, visible(request, Trigger), TriggerSerializer)
+
+
+@api_view(['GET'])
+def profile_behaviors(request, profile_id):
+    return profile_children_response(request, profile_id, visible(request, Behavior), BehaviorSerializer)
+
+
+@api_view(['GET'])
+def profile_interventions(request, profile_id):
+    return profile_children_response(request, profile_id, visible(request, Intervention), InterventionSerializer)
+
+
+@api_view(['GET'])
+def profile_sessions(request, profile_id):
+    return profile_children_response(request, profile_id, visible(request, Session), SessionSerializer)
+
+
+# Episodes, sessions, triggers, behaviors and interventions merged in time order
+@api_view(['GET'])
+def profile_timeline(request, profile_id):
+    if not visible(request, Profile).filter(id=profile_id).exists():
+        return handle_not_found('Profile')
+    return Response(build_timeline(request, profile_id))
+
+
+# Episode statistics per day / week / month, read from the precomputed rollups
+@api_view(['GET'])
+def profile_analytics(request, profile_id):
+    if not visible(request, Profile).filter(id=profile_id).exists():
+        return handle_not_found('Profile')
+    period = request.query_params.get('period', EpisodeRollup.WEEK)
+    if period not in dict(EpisodeRollup.PERIODS):
+        return Response({'period': [f'Expected one of: {", ".join(dict(EpisodeRollup.PERIODS))}']},
+                        status=status.HTTP_400_BAD_REQUEST)
+    rollups = EpisodeRollup.objects.filter(profile_id=profile_id, period=period)
+    since, until = parse_date_param(request, 'since'), parse_date_param(request, 'until')
+    if since:
+        rollups = rollups.filter(period_start__gte=since)
+    if until:
+        rollups = rollups.filter(period_start__lte=until)
+    serializer = EpisodeRollupSerializer(rollups.order_by('period_start'), many=True)
+    return Response({'profile': profile_id, 'period': period, 'results': serializer.data})
 
 
 @api_view(['PUT'])
 def update_profile(request, profile_id):
-    profile = get_object_or_404(Profile, id=profile_id, is_deleted=False)
-    serializer = ProfileSerializer(profile, data=request.data)
+    profile = get_object_or_404(visible(request, Profile), id=profile_id)
+    previous_owner = profile.user_id
+    serializer = ProfileSerializer(profile, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
+        # The post_save signal only knows the new owner
+        forget_profile_ids(previous_owner)
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['DELETE'])
 def delete_profile(request, profile_id):
-    profile = get_object_or_404(Profile, id=profile_id, is_deleted=False)
+    profile = get_object_or_404(visible(request, Profile), id=profile_id)
     soft_delete(profile)
     return Response({'message': 'Profile soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
@@ -123,7 +276,7 @@ def delete_profile(request, profile_id):
 # TRIGGER VIEWS
 @api_view(['POST'])
 def create_trigger(request):
-    serializer = TriggerSerializer(data=request.data)
+    serializer = TriggerSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -132,22 +285,19 @@ def create_trigger(request):
 
 @api_view(['GET'])
 def trigger_list(request):
-    triggers = Trigger.objects.filter(is_deleted=False)
-    serializer = TriggerSerializer(triggers, many=True)
-    return Response(serializer.data)
+    triggers = filter_queryset(visible(request, Trigger), request)
+    return list_response(request, triggers, TriggerSerializer)
 
 
 @api_view(['GET'])
 def single_trigger(request, trigger_id):
-    trigger = get_object_or_404(Trigger, id=trigger_id, is_deleted=False)
-    serializer = TriggerSerializer(trigger)
-    return Response(serializer.data)
+    return detail_response(request, visible(request, Trigger), TriggerSerializer, id=trigger_id)
 
 
 @api_view(['PUT'])
 def update_trigger(request, trigger_id):
-    trigger = get_object_or_404(Trigger, id=trigger_id, is_deleted=False)
-    serializer = TriggerSerializer(trigger, data=request.data)
+    trigger = get_object_or_404(visible(request, Trigger), id=trigger_id)
+    serializer = TriggerSerializer(trigger, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -156,15 +306,31 @@ def update_trigger(request, trigger_id):
 
 @api_view(['DELETE'])
 def delete_trigger(request, trigger_id):
-    trigger = get_object_or_404(Trigger, id=trigger_id, is_deleted=False)
+    trigger = get_object_or_404(visible(request, Trigger), id=trigger_id)
     soft_delete(trigger)
     return Response({'message': 'Trigger soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
+# Batch trigger writes: arrays in, per-item results and errors out
+@api_view(['POST'])
+def bulk_create_triggers(request):
+    return bulk.bulk_create(request, TriggerSerializer)
+
+
+@api_view(['PUT'])
+def bulk_update_triggers(request):
+    return bulk.bulk_update(request, TriggerSerializer, visible(request, Trigger))
+
+
+@api_view(['DELETE'])
+def bulk_delete_triggers(request):
+    return bulk.bulk_delete(request, visible(request, Trigger))
+
+
 # BEHAVIOR VIEWS
 @api_view(['POST'])
 def create_behavior(request):
-    serializer = BehaviorSerializer(data=request.data)
+    serializer = BehaviorSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -173,22 +339,19 @@ def create_behavior(request):
 
 @api_view(['GET'])
 def behavior_list(request):
-    behaviors = Behavior.objects.filter(is_deleted=False)
-    serializer = BehaviorSerializer(behaviors, many=True)
-    return Response(serializer.data)
+    behaviors = filter_queryset(visible(request, Behavior), request)
+    return list_response(request, behaviors, BehaviorSerializer)
 
 
 @api_view(['GET'])
 def single_behavior(request, behavior_id):
-    behavior = get_object_or_404(Behavior, id=behavior_id, is_deleted=False)
-    serializer = BehaviorSerializer(behavior)
-    return Response(serializer.data)
+    return detail_response(request, visible(request, Behavior), BehaviorSerializer, id=behavior_id)
 
 
 @api_view(['PUT'])
 def update_behavior(request, behavior_id):
-    behavior = get_object_or_404(Behavior, id=behavior_id, is_deleted=False)
-    serializer = BehaviorSerializer(behavior, data=request.data)
+    behavior = get_object_or_404(visible(request, Behavior), id=behavior_id)
+    serializer = BehaviorSerializer(behavior, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -197,15 +360,31 @@ def update_behavior(request, behavior_id):
 
 @api_view(['DELETE'])
 def delete_behavior(request, behavior_id):
-    behavior = get_object_or_404(Behavior, id=behavior_id, is_deleted=False)
+    behavior = get_object_or_404(visible(request, Behavior), id=behavior_id)
     soft_delete(behavior)
     return Response({'message': 'Behavior soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
+# Batch behavior writes: arrays in, per-item results and errors out
+@api_view(['POST'])
+def bulk_create_behaviors(request):
+    return bulk.bulk_create(request, BehaviorSerializer)
+
+
+@api_view(['PUT'])
+def bulk_update_behaviors(request):
+    return bulk.bulk_update(request, BehaviorSerializer, visible(request, Behavior))
+
+
+@api_view(['DELETE'])
+def bulk_delete_behaviors(request):
+    return bulk.bulk_delete(request, visible(request, Behavior))
+
+
 # INTERVENTION VIEWS
 @api_view(['POST'])
 def create_intervention(request):
-    serializer = InterventionSerializer(data=request.data)
+    serializer = InterventionSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -214,22 +393,19 @@ def create_intervention(request):
 
 @api_view(['GET'])
 def intervention_list(request):
-    interventions = Intervention.objects.filter(is_deleted=False)
-    serializer = InterventionSerializer(interventions, many=True)
-    return Response(serializer.data)
+    interventions = filter_queryset(visible(request, Intervention), request)
+    return list_response(request, interventions, InterventionSerializer)
 
 
 @api_view(['GET'])
 def single_intervention(request, intervention_id):
-    intervention = get_object_or_404(Intervention, id=intervention_id, is_deleted=False)
-    serializer = InterventionSerializer(intervention)
-    return Response(serializer.data)
+    return detail_response(request, visible(request, Intervention), InterventionSerializer, id=intervention_id)
 
 
 @api_view(['PUT'])
 def update_intervention(request, intervention_id):
-    intervention = get_object_or_404(Intervention, id=intervention_id, is_deleted=False)
-    serializer = InterventionSerializer(intervention, data=request.data)
+    intervention = get_object_or_404(visible(request, Intervention), id=intervention_id)
+    serializer = InterventionSerializer(intervention, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -238,15 +414,31 @@ def update_intervention(request, intervention_id):
 
 @api_view(['DELETE'])
 def delete_intervention(request, intervention_id):
-    intervention = get_object_or_404(Intervention, id=intervention_id, is_deleted=False)
+    intervention = get_object_or_404(visible(request, Intervention), id=intervention_id)
     soft_delete(intervention)
     return Response({'message': 'Intervention soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
+# Batch intervention writes: arrays in, per-item results and errors out
+@api_view(['POST'])
+def bulk_create_interventions(request):
+    return bulk.bulk_create(request, InterventionSerializer)
+
+
+@api_view(['PUT'])
+def bulk_update_interventions(request):
+    return bulk.bulk_update(request, InterventionSerializer, visible(request, Intervention))
+
+
+@api_view(['DELETE'])
+def bulk_delete_interventions(request):
+    return bulk.bulk_delete(request, visible(request, Intervention))
+
+
 # SESSION VIEWS
 @api_view(['POST'])
 def create_session(request):
-    serializer = SessionSerializer(data=request.data)
+    serializer = SessionSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -255,22 +447,19 @@ def create_session(request):
 
 @api_view(['GET'])
 def session_list(request):
-    sessions = Session.objects.filter(is_deleted=False)
-    serializer = SessionSerializer(sessions, many=True)
-    return Response(serializer.data)
+    sessions = filter_queryset(visible(request, Session), request)
+    return list_response(request, sessions, SessionSerializer)
 
 
 @api_view(['GET'])
 def single_session(request, session_id):
-    session = get_object_or_404(Session, id=session_id, is_deleted=False)
-    serializer = SessionSerializer(session)
-    return Response(serializer.data)
+    return detail_response(request, visible(request, Session), SessionSerializer, id=session_id)
 
 
 @api_view(['PUT'])
 def update_session(request, session_id):
-    session = get_object_or_404(Session, id=session_id, is_deleted=False)
-    serializer = SessionSerializer(session, data=request.data)
+    session = get_object_or_404(visible(request, Session), id=session_id)
+    serializer = SessionSerializer(session, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -279,13 +468,41 @@ def update_session(request, session_id):
 
 @api_view(['DELETE'])
 def delete_session(request, session_id):
-    session = get_object_or_404(Session, id=session_id, is_deleted=False)
+    session = get_object_or_404(visible(request, Session), id=session_id)
     soft_delete(session)
     return Response({'message': 'Session soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
+
+
+# Batch session writes: arrays in, per-item results and errors out
+@api_view(['POST'])
+def bulk_create_sessions(request):
+    return bulk.bulk_create(request, SessionSerializer)
+
+
+@api_view(['PUT'])
+def bulk_update_sessions(request):
+    return bulk.bulk_update(request, SessionSerializer, visible(request, Session))
+
+
+@api_view(['DELETE'])
+def bulk_delete_sessions(request):
+    return bulk.bulk_delete(request, visible(request, Session))
+
+
 # EPISODE VIEWS
 @api_view(['POST'])
 def create_episode(request):
-    serializer = EpisodeSerializer(data=request.data)
+    serializer = EpisodeSerializer(data=request.data, context={'request': request})
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Episode with nested triggers, behaviors and interventions, written in one transaction
+@api_view(['POST'])
+def ingest_episode(request):
+    serializer = EpisodeIngestSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -294,22 +511,19 @@ def create_episode(request):
 
 @api_view(['GET'])
 def episode_list(request):
-    episodes = Episode.objects.filter(is_deleted=False)
-    serializer = EpisodeSerializer(episodes, many=True)
-    return Response(serializer.data)
+    episodes = filter_queryset(visible(request, Episode), request)
+    return list_response(request, episodes, EpisodeSerializer)
 
 
 @api_view(['GET'])
 def single_episode(request, episode_id):
-    episode = get_object_or_404(Episode, id=episode_id, is_deleted=False)
-    serializer = EpisodeSerializer(episode)
-    return Response(serializer.data)
+    return detail_response(request, visible(request, Episode), EpisodeSerializer, cached=True, id=episode_id)
 
 
 @api_view(['PUT'])
 def update_episode(request, episode_id):
-    episode = get_object_or_404(Episode, id=episode_id, is_deleted=False)
-    serializer = EpisodeSerializer(episode, data=request.data)
+    episode = get_object_or_404(visible(request, Episode), id=episode_id)
+    serializer = EpisodeSerializer(episode, data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -318,15 +532,104 @@ def update_episode(request, episode_id):
 
 @api_view(['DELETE'])
 def delete_episode(request, episode_id):
-    episode = get_object_or_404(Episode, id=episode_id, is_deleted=False)
+    episode = get_object_or_404(visible(request, Episode), id=episode_id)
     soft_delete(episode)
     return Response({'message': 'Episode soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
+# DELTA SYNC
+@api_view(['GET'])
+def sync(request):
+    profile_id = request.query_params.get('profile')
+    if profile_id is not None and not profile_id.isdigit():
+        return Response({'error': 'profile must be an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+    changes, token, has_more = collect_changes(
+        request.query_params.get('since'), profile_id=profile_id, profile_ids=syncable_profile_ids(request.user)
+    )
+    return Response({'token': token, 'has_more': has_more, 'changes': changes})
+
+
+# Full export of the caller's profiles and their records as gzip-compressed NDJSON
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_records(request):
+    lines = (line for _, line in iter_export_lines(visible_profile_ids(request.user)))
+    response = StreamingHttpResponse(streaming_content(request, iter_gzip(lines)), content_type='application/gzip')
+    filename = f'serenitytrack-export-{timezone.now():%Y%m%d-%H%M%S}.ndjson.gz'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Hit/miss counts of the serialized payload cache for this worker process
+@api_view(['GET'])
+def cache_stats(request):
+    return Response(caching.stats())
+
+
+# Per-endpoint request metrics of this worker process, in the Prometheus text format
+@require_GET
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # TOKEN VIEW
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+
+class RevocableTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer
+
+
+# Logout: revoke the refresh token and, when sent, the access token of this request
+@api_view(['POST'])
+def logout(request):
+    serializer = LogoutSerializer(data=request.data)
+    if serializer.is_valid():
+        revocation_store.revoke(serializer.validated_data['refresh'])
+        if request.auth is not None:
+            revocation_store.revoke(request.auth)
+        return Response({'message': 'Logged out successfully'})
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Async login for ASGI workers: the user lookup uses the async ORM and password
+# hashing runs on the bounded hash pool, so slow hashes never block the event loop.
+@csrf_exempt
+@require_POST
+async def async_login(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'Malformed JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(data, dict):
+        data = {}
+    # Trimmed like the CharFields of CustomTokenObtainPairSerializer, so both logins agree
+    fields = {
+        field: data[field].strip() if isinstance(data.get(field), str) else ''
+        for field in ('username', 'password')
+    }
+    errors = {field: ['This field is required.'] for field, value in fields.items() if not value}
+    if errors:
+        return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = await EmailOrUsernameModelBackend().aauthenticate(
+            request, username=fields['username'], password=fields['password']
+        )
+    except PoolSaturated:
+        response = JsonResponse(
+            {'detail': 'Too many logins in progress, retry shortly.'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+        response['Retry-After'] = '1'
+        return response
+    if user is None:
+        return JsonResponse({'non_field_errors': ['Invalid credentials']}, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse(await sync_to_async(login_payload)(user))
+
 @api_view(['POST'])
 def create_school(request):
     serializer = SchoolSerializer(data=request.data)
@@ -337,19 +640,16 @@ def create_school(request):
 
 @api_view(['GET'])
 def school_list(request):
-    schools = School.objects.filter(is_deleted=False)
-    serializer = SchoolSerializer(schools, many=True)
-    return Response(serializer.data)
+    schools = School.objects.all()
+    return list_response(request, schools, SchoolSerializer, cached=True)
 
 @api_view(['GET'])
 def single_school(request, school_id):
-    school = get_object_or_404(School, id=school_id, is_deleted=False)
-    serializer = SchoolSerializer(school)
-    return Response(serializer.data)
+    return detail_response(request, School.objects.all(), SchoolSerializer, id=school_id)
 
 @api_view(['PUT'])
 def update_school(request, school_id):
-    school = get_object_or_404(School, id=school_id, is_deleted=False)
+    school = get_object_or_404(School, id=school_id)
     serializer = SchoolSerializer(school, data=request.data)
     if serializer.is_valid():
         serializer.save()
@@ -358,7 +658,7 @@ def update_school(request, school_id):
 
 @api_view(['DELETE'])
 def delete_school(request, school_id):
-    school = get_object_or_404(School, id=school_id, is_deleted=False)
+    school = get_object_or_404(School, id=school_id)
     school.is_deleted = True
     school.save()
     return Response({'message': 'School soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
@@ -373,19 +673,16 @@ def create_therapist(request):
 
 @api_view(['GET'])
 def therapist_list(request):
-    therapists = Therapist.objects.filter(is_deleted=False)
-    serializer = TherapistSerializer(therapists, many=True)
-    return Response(serializer.data)
+    therapists = Therapist.objects.all()
+    return list_response(request, therapists, TherapistSerializer, cached=True)
 
 @api_view(['GET'])
 def single_therapist(request, therapist_id):
-    therapist = get_object_or_404(Therapist, id=therapist_id, is_deleted=False)
-    serializer = TherapistSerializer(therapist)
-    return Response(serializer.data)
+    return detail_response(request, Therapist.objects.all(), TherapistSerializer, id=therapist_id)
 
 @api_view(['PUT'])
 def update_therapist(request, therapist_id):
-    therapist = get_object_or_404(Therapist, id=therapist_id, is_deleted=False)
+    therapist = get_object_or_404(Therapist, id=therapist_id)
     serializer = TherapistSerializer(therapist, data=request.data)
     if serializer.is_valid():
         serializer.save()
@@ -394,7 +691,7 @@ def update_therapist(request, therapist_id):
 
 @api_view(['DELETE'])
 def delete_therapist(request, therapist_id):
-    therapist = get_object_or_404(Therapist, id=therapist_id, is_deleted=False)
+    therapist = get_object_or_404(Therapist, id=therapist_id)
     therapist.is_deleted = True
     therapist.save()
     return Response({'message': 'Therapist soft-deleted successfully'}, status=status.HTTP_204_NO_CONTENT)